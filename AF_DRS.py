@@ -13,17 +13,20 @@ import acsys
 import sys
 import os
 import time
-import configparser
+_importStart = time.perf_counter()
 import platform
-import traceback
-import threading
-import hashlib
 
 appName = 'AF_DRS'
 imgPath = ('apps/python/%s/img/' % appName)
 penaltyFlag = 'content/gui/flags/penalty.png'
+CHAT_LINE = 200  # characters per chat message the steward summary is packed into
 
-# import libraries
+# everything goes to ac.log through here, buffered once acMain starts the flush timer
+from lib.log_buffer import LogBuffer
+log = LogBuffer(ac.log, appName)
+
+# library search path. The libraries themselves (shared memory pages, sound
+# thread, rule helpers) are only loaded by acMain once the car is allowed.
 try:
     if platform.architecture()[0] == "64bit":
         sysdir = 'apps/python/%s/dll/stdlib64' % appName
@@ -31,22 +34,20 @@ try:
         sysdir = 'apps/python/%s/dll/stdlib' % appName
     sys.path.insert(0, sysdir)
     os.environ['PATH'] = os.environ['PATH'] + ";."
-    
-    from lib.sim_info import info
-    
-    import ctypes
-    from sound_player import SoundPlayer
-    
 except Exception as e:
-    ac.log(appName + ": Error importing libraries: %s" % e)
-    msg = 'Exception: {}'.format(traceback.format_exc())
-    ac.log(msg)
-    # raise
+    log.error("Error setting library path: %s" % e)
 
 #globals
-updateTime = 1000 / 30 #30 Hz because I felt like it!
+updateTime = 1000 / 30 # ms between updates, set by the race update from the distance to the next DRS line
 audio = ('apps/python/%s/beep.wav' % appName)
-sound_player = SoundPlayer(audio)
+journalPath = ('apps/python/%s/penalties.journal' % appName)
+manifestCache = ('apps/python/%s/manifest.cache' % appName)
+configCachePath = ('apps/python/%s/config.cache' % appName)
+zoneCachePath = ('apps/python/%s/zones.cache' % appName)
+rulesPath = ('apps/python/%s/rules.ini' % appName)
+preferencesPath = ('apps/python/%s/preferences.ini' % appName)
+timingPath = ('apps/python/%s/timing.csv' % appName)
+sound_player = None # Beep player, only created when beeps are on
 session = -1
 
 lastUpdateTime = 0
@@ -55,111 +56,286 @@ driverData = None   # Data of last drs detection line each driver crossed and tr
 settings = None     # App settings
 rules = None        # Rules
 validCar = False    # Flag that aborts the app if not driver car not in list in rules
+recorder = None     # Telemetry recorder, only when enabled in preferences
+sim = None          # Snapshot of the shared memory pages for the current update
+scheduler = None    # Delayed callbacks, advanced by acUpdate
+simClock = None     # Session time from the sim's lap timer
+simTime = 0         # simClock time of the current update
+journalTimer = None # Regular flush of the penalty journal
+rulesTimer = None   # Regular check of rules.ini for edits
+chat = None         # Outbound chat messages, sent within the rate budget
+manifest = None     # Checksums of the app files, only when announcing the app
+configCache = None  # Parsed preferences and rules, reused while the files are unchanged
+rulesStamp = None   # Size and mtime of rules.ini when rules were loaded
+timing = None       # Time spent per update region, only when enabled in preferences
+TIMED_REGIONS = ("update", "quali", "start", "tyre", "drs", "pit", "display")
+T_UPDATE, T_QUALI, T_START, T_TYRE, T_DRS, T_PIT, T_DISPLAY = range(len(TIMED_REGIONS))
+importTime = time.perf_counter() - _importStart
+
+def loadLibraries():
+    # heavy imports, mapping the shared memory pages happens here
+    global info, ZoneIndex, passed, CrossingDetector, DriverStore, CrossingLog, TelemetryRecorder, scheduler, RetainedUi, simClock, PenaltyJournal, chat, Steward
+    from lib.sim_info import info
+    from lib.zone_index import ZoneIndex, passed
+    from lib.drs_crossing import CrossingDetector
+    from lib.driver_state import DriverStore
+    from lib.crossing_log import CrossingLog
+    from lib.telemetry import TelemetryRecorder
+    from lib.scheduler import Scheduler
+    from lib.ui_state import RetainedUi
+    from lib.sim_clock import SimClock
+    from lib.penalty_journal import PenaltyJournal
+    from lib.chat_queue import ChatQueue
+    if settings.steward:
+        from lib.steward import Steward
+    scheduler = Scheduler()
+    simClock = SimClock()
+    chat = ChatQueue(sendChat, scheduler, settings.chatRate, settings.chatBurst, warn=log.warning)
+
+def logStartup(phases):
+    # phases is a list of (name, seconds)
+    total = importTime + sum(seconds for name, seconds in phases)
+    detail = ", ".join("%s %.1f" % (name, seconds * 1000) for name, seconds in [("import", importTime)] + phases)
+    log.info("Startup %.1f ms (%s)" % (total * 1000, detail))
 
 #acMain set up UI and initilase structures.
 def acMain(ac_version):
     try:
-        global appName, drsData, driverData, settings, rules
+        global appName, drsData, driverData, settings, rules, sound_player, manifest, configCache, timing, rulesTimer
+        phases = []
+        start = time.perf_counter()
         
+        from lib.config_cache import ConfigCache
+        configCache = ConfigCache(configCachePath)
         settings = appSettings()
-        rules = ruleSet() 
         
         car = ac.getCarName(0)
         if car not in settings.allowedCars:
-            ac.log(appName + ": not an allowed car closing app")
+            log.warning("not an allowed car closing app")
+            settings.appRunning = False
+            phases.append(("settings", time.perf_counter() - start))
+            logStartup(phases)
+            return
+        
+        rules = loadRules()
+        phases.append(("settings", time.perf_counter() - start))
+        if rules is None:
             settings.appRunning = False
+            logStartup(phases)
             return
             
         serverName = ac.getServerName() 
-        ac.log(appName + ": Server: %s" % serverName)
+        log.info("Server: %s" % serverName)
         for x in settings.serverNames:
-           ac.log(appName + ": Check for: |%s|" % x) 
+           log.info("Check for: |%s|" % x) 
             
         if any(name in serverName for name in settings.serverNames):
-            ac.log(appName + ": match found") 
+            log.info("match found") 
             settings.postChat = True
+        
+        start = time.perf_counter()
+        try:
+            loadLibraries()
+        except Exception as e:
+            log.error("Error importing libraries: %s" % e, exc=True)
+            settings.appRunning = False
+            return
+        # rules.ini edits apply without restarting the game
+        rulesTimer = scheduler.after(2, checkRules)
+        # log writes leave the update path
+        log.level = settings.logLevel
+        log.immediate = False
+        scheduler.after(settings.logFlush, flushLog)
+        if settings.timing:
+            from lib.region_timer import RegionTimer
+            timing = RegionTimer(TIMED_REGIONS, timingPath)
+            scheduler.after(settings.timingInterval, dumpTimings)
+        if settings.postChat:
+            # files are hashed in the background, ready well before the announcement
+            from lib.manifest import Manifest
+            manifest = Manifest('apps/python/%s' % appName, manifestCache)
+            manifest.start()
             # delay on displaying app running message to make sure things are running
-            timer = threading.Timer(10, announceAppRunning)
-            timer.start()    
+            scheduler.after(10, announceAppRunning)
+        if settings.beepOn:
+            # sound stack and its worker thread only when beeps are wanted
+            from sound_player import SoundPlayer
+            sound_player = SoundPlayer(audio)
+        phases.append(("libraries", time.perf_counter() - start))
         
+        start = time.perf_counter()
         drsData = drs()
+        phases.append(("zones", time.perf_counter() - start))
+        start = time.perf_counter()
         driverData = driverInfo()
+        phases.append(("ui", time.perf_counter() - start))
+        
+        if settings.telemetry:
+            start = time.perf_counter()
+            startTelemetry()
+            phases.append(("telemetry", time.perf_counter() - start))
         
-        ac.log(appName + ": acMain complete")
+        logStartup(phases)
+        log.info("acMain complete")
     except Exception as e:
-        ac.log(appName + ": Error in acMain: %s" % e)
-        msg = 'Exception: {}'.format(traceback.format_exc())
-        ac.log(msg)    
+        log.error("Error in acMain: %s" % e, exc=True)
+    finally:
+        # startup messages out now, the timer takes over from here
+        log.flush()
 
 def acUpdate(deltaT):
     try:
-        global lastUpdateTime, driverData, session, settings
+        global lastUpdateTime, driverData, session, settings, sim, simTime, updateTime
         
         if settings.appRunning is False:
             return
         
+        # delayed callbacks run every frame, on this thread
+        scheduler.advance(deltaT)
+        
         lastUpdateTime += deltaT
         if lastUpdateTime < float(updateTime)/1000:
             return
+        elapsed = lastUpdateTime
         lastUpdateTime = 0        
+        if timing is not None:
+            updateStart = timing.now()
+        
+        # consistent copy of the shared memory pages for everything this update reads
+        sim = info.snapshot()
+        simTime = simClock.update(sim.graphics, elapsed)
         
         lastSession = session
-        session = info.graphics.session
+        session = sim.graphics.session
+        if session != 2:
+            updateTime = 1000 / settings.baseRate
+            if lastSession != session:
+                # out of the race, penalties restored from the journal are the last race's
+                driverData.clearLastRace()
         
         if session == 1:
             if lastSession != session:
                 #gone to Q set visibilities
-                ac.setVisible(driverData.penIcon, 0)
-                ac.setVisible(driverData.penCounter, 0)
-                ac.setVisible(driverData.drsIcon, 0)
-                ac.setVisible(driverData.qTyreLabel, 1)
+                driverData.ui.setVisible(driverData.penIcon, 0)
+                driverData.ui.setVisible(driverData.penCounter, 0)
+                driverData.ui.setVisible(driverData.drsIcon, 0)
+                driverData.ui.setVisible(driverData.qTyreLabel, 1)
             # Quali need to find tyres used on best lap
-            driverData.qualiUpdate()
+            if timing is not None:
+                qualiStart = timing.now()
+                driverData.qualiUpdate()
+                timing.lap(T_QUALI, qualiStart)
+            else:
+                driverData.qualiUpdate()
+            if recorder is not None:
+                # race updates the spline positions, in quali read them for the recording
+                driverData.drivers.update(getSplinePosition, ac.isConnected)
+                recordTelemetry()
         elif session == 2:
             # Race
             if lastSession != session:
                 #gone to Race set visibilities
-                ac.setVisible(driverData.penIcon, 0)
-                ac.setVisible(driverData.penCounter, 0)
-                ac.setVisible(driverData.drsIcon, 1)
-                ac.setVisible(driverData.qTyreLabel, 0)
+                driverData.ui.setVisible(driverData.penIcon, 0)
+                driverData.ui.setVisible(driverData.penCounter, 0)
+                driverData.ui.setVisible(driverData.drsIcon, 1)
+                driverData.ui.setVisible(driverData.qTyreLabel, 0)
+                # cars moved to the grid, don't treat that as driving over detection lines
+                driverData.drivers.reset()
             # Start tyre = quali tyre
             # Start fuel > minimum
             # DRS used within 1s of car ahead and from lap 3 onwards
             # At least 2 compounds used
             driverData.raceUpdate()
+            if recorder is not None:
+                recordTelemetry()
         else:
             #any other session turn everything off
-            ac.setVisible(driverData.penIcon, 0)
-            ac.setVisible(driverData.penCounter, 0)
-            ac.setVisible(driverData.drsIcon, 0)
-            ac.setVisible(driverData.qTyreLabel, 0)
+            driverData.ui.setVisible(driverData.penIcon, 0)
+            driverData.ui.setVisible(driverData.penCounter, 0)
+            driverData.ui.setVisible(driverData.drsIcon, 0)
+            driverData.ui.setVisible(driverData.qTyreLabel, 0)
+        
+        if timing is not None:
+            timing.lap(T_UPDATE, updateStart)
             
     except Exception as e:
-        ac.log(appName + ": Error in acUpdate: %s" % e)
-        msg = 'Exception: {}\n{}'.format(time.asctime(), traceback.format_exc())
-        ac.log(msg)    
+        # a fault that repeats every update is logged once per flush
+        log.error("Error in acUpdate: %s" % e, exc=True)
+
+def acShutdown():
+    try:
+        if recorder is not None:
+            recorder.close()
+        if sound_player is not None:
+            sound_player.close()
+        if driverData is not None:
+            driverData.ledger.close()
+            if driverData.steward is not None:
+                log.info("Steward awarded %d penalties" % driverData.steward.awarded)
+            log.info("Widget calls: %d made, %d skipped unchanged" % (driverData.ui.calls, driverData.ui.saved))
+        if chat is not None:
+            # race end results are usually still queued, don't leave them to the budget
+            unsent = len(chat)
+            chat.flush()
+            if chat.merged or chat.dropped or unsent:
+                log.info("Chat messages: %d sent (%d at shutdown), %d merged, %d dropped" % (chat.sent, unsent, chat.merged, chat.dropped))
+        if configCache is not None:
+            log.info("Config files read from cache: %d" % configCache.hits)
+        if timing is not None:
+            dumpTimings(False)
+    except Exception as e:
+        log.error("Error in acShutdown: %s" % e)
+    finally:
+        log.flush()
+
+def startTelemetry(path=None):
+    global recorder
+    try:
+        if path is None:
+            folder = 'apps/python/%s/telemetry' % appName
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            path = '%s/%s_%s.afr' % (folder, ac.getTrackName(0), time.strftime('%Y%m%d_%H%M%S'))
+        meta = {
+            "track": ac.getTrackName(0),
+            "config": ac.getTrackConfiguration(0),
+            "trackLength": driverData.trackLength,
+            "zones": drsData.zones,
+            "drivers": [ac.getDriverName(index) for index in range(driverData.drivers.count)],
+            "rules": rules._asdict(),
+            }
+        recorder = TelemetryRecorder(path, driverData.drivers.count, meta)
+        log.info("Recording telemetry to %s" % path)
+    except Exception as e:
+        recorder = None
+        log.error("Error starting telemetry: %s" % e)
+
+def recordTelemetry():
+    recorder.record(time.time(), sim.physics, sim.graphics,
+        ac.getCarState(0, acsys.CS.BestLap), ac.getCarTyreCompound(0), driverData.drivers.spline)
 
 def announceAppRunning():
     try:
-        hasher = hashlib.md5()
-        with open(('apps/python/%s/%s.py' % (appName,appName)), 'rb') as afile:
-            buf = afile.read()
-            hasher.update(buf)
-        
-        hasher2 = hashlib.md5()
-        with open(('apps/python/%s/rules.ini' % appName), 'rb') as afile:
-            buf = afile.read()
-            hasher2.update(buf)
+        if not manifest.ready.is_set():
+            # still hashing, try again shortly
+            scheduler.after(1, announceAppRunning)
+            return
+        if manifest.error is not None:
+            log.error("Error building checksums: %s" % manifest.error)
+            appChecksum = ruleChecksum = "unavailable"
+        else:
+            appChecksum = manifest.digest()
+            ruleChecksum = manifest.files.get('rules.ini', "missing")
+            log.info("Checksums over %d files, %d hashed this session" % (len(manifest.files), manifest.hashed))
             
-        ac.sendChatMessage(appName + " is running. DRSGap=" + str(rules.drsGap) + "; DRSLap=" + str(rules.drsEnabledLap) + "; Fuel=" + str(rules.refuelling))
-        ac.sendChatMessage(appName + (" App  checksum: %s" % hasher.hexdigest()))
-        ac.sendChatMessage(appName + (" Rule checksum: %s" % hasher2.hexdigest()))
+        chat.post(appName + " is running. DRSGap=" + str(rules.drsGap) + "; DRSLap=" + str(rules.drsEnabledLap) + "; Fuel=" + str(rules.refuelling))
+        chat.post(appName + (" App  checksum: %s" % appChecksum))
+        chat.post(appName + (" Rule checksum: %s" % ruleChecksum))
         
-        ac.log(appName + ": Report app running. App checksum: %s" % hasher.hexdigest())
-        ac.log(appName + ": Rule checksum: %s" % hasher2.hexdigest())
+        log.info("Report app running. App checksum: %s" % appChecksum)
+        log.info("Rule checksum: %s" % ruleChecksum)
     except Exception as e:
-        ac.log(appName + ": Error in announceApp: %s" % e)
+        log.error("Error in announceApp: %s" % e)
         
 def announcePenalty(pen):
     try:
@@ -168,17 +344,48 @@ def announcePenalty(pen):
         if settings.postChat is False:
             return
             
-        ac.sendChatMessage(appName + ": Penalty, Lap: %d Detail: %s" % (pen["lap"], pen["detail"]))
+        # repeats of the same penalty on the same lap still queued go out as one line with a count
+        chat.post(appName + ": Penalty, Lap: %d Detail: %s" % (pen["lap"], pen["detail"]), (pen["lap"], pen["detail"]))
         
     except Exception as e:
-        ac.log(appName + ": Error in announce penalty: %s" % e)
+        log.error("Error in announce penalty: %s" % e)
+
+def logStewardPenalty(pen):
+    # penalty of another car, judged in steward mode. Only logged, a grid's worth
+    # would overrun the chat budget, chat gets announceStewardSummary at race end
+    log.info("Steward penalty, Car: %d Driver: %s Lap: %d Detail: %s" % (pen["car"], pen["driver"], pen["lap"], pen["detail"]))
+
+def announceStewardSummary():
+    # post race penalties of every other car, as few chat lines as fit
+    try:
+        if settings.postChat is False:
+            return
+        prefix = appName + ": Post race penalties: "
+        entries = []
+        for driver, count in driverData.steward.summary():
+            entry = "%s x%d" % (driver, count)
+            if entries and len(prefix) + len("; ".join(entries + [entry])) > CHAT_LINE:
+                chat.post(prefix + "; ".join(entries))
+                entries = []
+            entries.append(entry)
+        if entries:
+            chat.post(prefix + "; ".join(entries))
+    except Exception as e:
+        log.error("Error in announce steward summary: %s" % e)
+
+def sendChat(msg):
+    try:
+        ac.sendChatMessage(msg)
+    except Exception as e:
+        log.error("Error sending chat message: %s" % e)
 
 def renderCallback(deltaT):
     try:
         global driverData
+        # every frame, the game resets the window opacity itself
         ac.setBackgroundOpacity(driverData.app, driverData.opacity)
     except Exception as e:
-        ac.log(appName + ": Error in renderCallback: %s" % e)
+        log.error("Error in renderCallback: %s" % e)
         
 def onChatMessage(msg, sender):
     global driverData
@@ -187,7 +394,7 @@ def onChatMessage(msg, sender):
             if("You have finished the race" in msg):
                 driverData.finishedRace = True
     except Exception as e:
-        ac.log(appName + ": Error in onChatMessage: %s" % e)
+        log.error("Error in onChatMessage: %s" % e)
 
 # was a JSON call updated to python API - JSON modules removed       
 def getTrackLength():
@@ -196,8 +403,62 @@ def getTrackLength():
 
         return trackLengthFloat
     except Exception as e:
-        ac.log(appName + ": Error in getTrackLength: %s" % e)
+        log.error("Error in getTrackLength: %s" % e)
         return 0
+
+def getSplinePosition(index):
+    return ac.getCarState(index, acsys.CS.NormalizedSplinePosition)
+
+def getLapCount(index):
+    return ac.getCarState(index, acsys.CS.LapCount)
+
+def getBestLap(index):
+    return ac.getCarState(index, acsys.CS.BestLap)
+
+def getSpeed(index):
+    return ac.getCarState(index, acsys.CS.SpeedKMH)
+
+def getDrs(index):
+    return ac.getCarState(index, acsys.CS.DrsEnabled)
+
+def openPenaltyJournal():
+    # restores this session's penalties if the app was reloaded mid-race
+    global journalTimer
+    key = [ac.getServerName(), ac.getTrackName(0), ac.getTrackConfiguration(0), ac.getCarName(0), ac.getDriverName(0)]
+    try:
+        ledger = PenaltyJournal(journalPath, key)
+        if ledger.restored:
+            log.info("Restored %d penalties from the journal" % ledger.restored)
+    except Exception as e:
+        log.warning("Error opening penalty journal, penalties kept in memory only: %s" % e)
+        ledger = PenaltyJournal(None, key)
+    journalTimer = scheduler.after(1.0, flushPenaltyJournal)
+    return ledger
+
+def dumpTimings(again=True):
+    # this period's percentiles to timing.csv and the log
+    try:
+        summary = timing.dump()
+        if summary:
+            log.info("Timing " + summary)
+    except Exception as e:
+        log.error("Error writing timings: %s" % e)
+    if again:
+        scheduler.after(settings.timingInterval, dumpTimings)
+
+def flushLog():
+    try:
+        log.flush()
+    except Exception as e:
+        ac.log(appName + ": Error writing log: %s" % e)
+    scheduler.after(settings.logFlush, flushLog)
+
+def flushPenaltyJournal():
+    try:
+        driverData.ledger.flush()
+    except Exception as e:
+        log.error("Error writing penalty journal: %s" % e)
+    journalTimer.rearm(1.0)
  
 class appSettings:
     def __init__(self):
@@ -208,63 +469,114 @@ class appSettings:
             self.beepOn = True
             self.beepLength = 0.5
             self.border = True
+            self.telemetry = False
+            self.baseRate = 10.0
+            self.lineRate = 60.0
+            self.lineLookahead = 1.0
+            self.chatRate = 1.0
+            self.chatBurst = 3
+            self.steward = False
+            self.stewardDrs = True
+            self.timing = False
+            self.timingInterval = 30.0
+            self.logLevel = 1
+            self.logFlush = 1.0
             
             self.appRunning = True
             self.postChat = False
             self.allowedCars = []
             self.serverNames = []
             
-            config = configparser.ConfigParser()
-            config.read('apps/python/%s/preferences.ini' % appName)
+            from lib.config_cache import PREFERENCES, Preferences
+            prefs = configCache.load(preferencesPath, PREFERENCES, Preferences)
             
-            self.opacity = config.getfloat('Main','BackgroundOpacity')
+            self.opacity = prefs.opacity
             if self.opacity < 0:
                 self.opacity = 0
             elif self.opacity > 1.0:
                 self.opacity = 1.0
             
-            border = config.getint('Main','Border')
-            if border == 0:
+            if prefs.border == 0:
                 self.border = False
             
-            self.scale = config.getfloat('Main','AppScale')
+            self.scale = prefs.scale
             
-            min = config.getint('Main','Minimal')
-            if min == 0:
+            if prefs.minimal == 0:
                 self.minimal = False
                 
-            beep = config.getint('Beep','BeepEnabled')
-            if beep == 0:
+            if prefs.beepEnabled == 0:
                 self.beepOn = False
-            self.beepLength = config.getfloat('Beep','BeepLength')
+            self.beepLength = prefs.beepLength
             
-            cars = config.items( "Cars" )
-            for key, car in cars:
-                self.allowedCars.append(car)
-                
-            servers = config.items( "Servers" )
-            for key, server in servers:
-                self.serverNames.append(server)
+            self.baseRate = max(1.0, prefs.baseRate)
+            self.lineRate = max(self.baseRate, prefs.lineRate)
+            self.lineLookahead = prefs.lineLookahead
             
-        except Exception as e:
-            ac.log(appName + ": Error in loading appSettings: %s" % e)
-            return
-
-class ruleSet:
-    def __init__(self):
-        try:
-            config = configparser.ConfigParser()
-            config.read('apps/python/%s/rules.ini' % appName)
+            self.chatRate = max(0.1, prefs.chatRate)
+            self.chatBurst = max(1, prefs.chatBurst)
+            
+            if prefs.steward == 1:
+                self.steward = True
+            # DrsEnabled is only in acsys builds that report it
+            if prefs.stewardDrs == 0 or not hasattr(acsys.CS, 'DrsEnabled'):
+                self.stewardDrs = False
+            
+            if prefs.telemetry == 1:
+                self.telemetry = True
+            
+            if prefs.timing == 1:
+                self.timing = True
+            self.timingInterval = max(1.0, prefs.timingInterval)
+            
+            self.logLevel = prefs.logLevel
+            self.logFlush = max(0.1, prefs.logFlush)
+            
+            self.allowedCars = list(prefs.cars)
+            self.serverNames = list(prefs.servers)
             
-            self.minCompounds = config.getint('Rules','MinTyreCompounds')
-            self.startQTyre = config.getint('Rules','startOnBestQualiTyre')
-            self.topXtyreInQ = config.getint('Rules','topXqualiTyre')
-            self.refuelling = config.getint('Rules','RefuellingAllowed')
-            self.drsGap = config.getfloat('Rules','DRSActivationTime')
-            self.drsEnabledLap = config.getint('Rules','DRSEnabledLap')
         except Exception as e:
-            ac.log(appName + ": Error in loading rules: %s" % e)
+            log.error("Error in loading appSettings: %s" % e)
             return
+
+def loadRules():
+    # Rules from rules.ini, None if it can't be loaded
+    global rulesStamp
+    try:
+        from lib.config_cache import RULES, Rules, stamp
+        rulesStamp = stamp(rulesPath)
+        return configCache.load(rulesPath, RULES, Rules)
+    except Exception as e:
+        log.error("Error in loading rules: %s" % e)
+        return None
+
+def checkRules():
+    # swap in edited rules between updates, a broken edit keeps the current rules
+    global rules
+    try:
+        from lib.config_cache import stamp
+        if stamp(rulesPath) != rulesStamp:
+            newRules = loadRules()
+            if newRules is not None and newRules != rules:
+                rules = newRules
+                log.info("Rules reloaded: DRSGap=%s; DRSLap=%s; Fuel=%s" % (rules.drsGap, rules.drsEnabledLap, rules.refuelling))
+                if driverData is not None:
+                    # keep crossings long enough for the new gap
+                    driverData.crossingLog.window = max(10.0, 2 * rules.drsGap)
+                    if driverData.steward is not None:
+                        driverData.steward.rules = rules
+                if settings.postChat:
+                    announceRulesChanged()
+    except Exception as e:
+        log.error("Error in checkRules: %s" % e)
+    rulesTimer.rearm(2)
+
+def announceRulesChanged():
+    # the server saw the rules and checksum at app start, tell it they changed
+    from lib.manifest import fileDigest
+    ruleChecksum = fileDigest(rulesPath)
+    chat.post(appName + " rules changed. DRSGap=" + str(rules.drsGap) + "; DRSLap=" + str(rules.drsEnabledLap) + "; Fuel=" + str(rules.refuelling))
+    chat.post(appName + (" Rule checksum: %s" % ruleChecksum))
+    log.info("Report rules changed. Rule checksum: %s" % ruleChecksum)
             
 class driverInfo:
     def __init__(self):
@@ -276,10 +588,14 @@ class driverInfo:
         self.startFuel = 0  # fuel at race start
         self.lastFuel = 0   # fuel level on previous update
         self.pitFuel = 0    # fuel at pit entry
-        self.penalties = [] # list of penalties to be served
-        self.timePenalties = [] # list of penalties to be handed out at race end
-        self.totalDrivers = ac.getCarsCount()  
-        self.lastList = []  # list of driver data from previous update
+        self.ledger = openPenaltyJournal() # penalties, journalled so a reload mid-race keeps them
+        self.penalties = self.ledger.pending # penalties to be served, oldest first
+        self.timePenalties = self.ledger.timed # penalties to be handed out at race end
+        self.drivers = DriverStore(ac.getCarsCount()) # spline and last drs detection line crossed for every car
+        self.crossingLog = CrossingLog(len(drsData.zones), self.drivers.count, max(10.0, 2 * rules.drsGap)) # recent crossings of each detection line
+        self.steward = None # rules for every other car, steward mode only
+        if settings.steward:
+            self.steward = Steward(self.drivers.count, rules, ac.getDriverName, getLapCount)
         self.raceCompounds = [] #list of tyre compounds used in race
         self.lastTime = 0   # time that function was called last time (for interpolation)
         self.trackLength = getTrackLength()
@@ -319,27 +635,30 @@ class driverInfo:
         #remove ac logo
         ac.setIconPosition(self.app, -10000, -10000)
         
+        # setters for the widgets below that skip unchanged values
+        self.ui = RetainedUi(ac)
+        
         self.drsIcon = ac.addButton(self.app, "")
         
-        ac.setBackgroundTexture(self.drsIcon, imgPath + "off_box.png")
+        self.ui.setBackgroundTexture(self.drsIcon, imgPath + "off_box.png")
         ac.drawBorder(self.drsIcon, 0)
-        ac.setBackgroundOpacity(self.drsIcon, 0)
+        self.ui.setBackgroundOpacity(self.drsIcon, 0)
         ac.drawBackground(self.drsIcon, 0)
         
         self.penIcon = ac.addButton(self.app, "")
-        ac.setBackgroundTexture(self.penIcon, penaltyFlag)
+        self.ui.setBackgroundTexture(self.penIcon, penaltyFlag)
         ac.drawBorder(self.penIcon, 0)
-        ac.setBackgroundOpacity(self.penIcon, 0)
+        self.ui.setBackgroundOpacity(self.penIcon, 0)
         ac.drawBackground(self.penIcon, 0)
-        ac.setVisible(self.penIcon, 0)
+        self.ui.setVisible(self.penIcon, 0)
         
         self.penCounter = ac.addLabel(self.app, "")
         ac.setFontAlignment(self.penCounter, 'right')
-        ac.setVisible(self.penCounter, 0)
+        self.ui.setVisible(self.penCounter, 0)
         
         self.qTyreLabel = ac.addLabel(self.app, "Race Start Tyre: ")
         ac.setFontAlignment(self.qTyreLabel, 'left')
-        ac.setVisible(self.qTyreLabel, 0)
+        self.ui.setVisible(self.qTyreLabel, 0)
         
         if settings.minimal is True:
             ac.setSize(self.drsIcon, 90*settings.scale, 30*settings.scale)
@@ -381,30 +700,36 @@ class driverInfo:
     # Update details for a race session.
         global updateTime, drsData, settings, rules
         
+        timer = timing
+        if timer is not None:
+            t = timer.now()
+        
         #region Start stuff
         if self.start is False:
         # Check for first lap starting conditions for resets etc
-            if info.graphics.completedLaps == 0 and info.graphics.iCurrentTime <= 0:
+            if sim.graphics.completedLaps == 0 and sim.graphics.iCurrentTime <= 0:
             #set fuel as start
                 self.start = True
-                self.startFuel = self.lastFuel = info.physics.fuel
+                # on the grid of a new race, drop penalties restored from the last one
+                self.clearLastRace()
+                self.startFuel = self.lastFuel = sim.physics.fuel
                 self.raceEnd = False
                 self.finishedRace = False
         else:
         #try to detect a reduction in fuel so driver has applied throttle so know they have there race fuel and tyres selected
-            if info.graphics.iCurrentTime > 5000:    
+            if sim.graphics.iCurrentTime > 5000:    
                 # turn off start flag 5s after lights out
                 self.start = False
             elif self.lastFuel != 0:
                 # start not yet detected so check for fuel drop
-                self.lastFuel = info.physics.fuel
+                self.lastFuel = sim.physics.fuel
                 fuelDelta = self.startFuel - self.lastFuel
                 if fuelDelta > 0 and fuelDelta < 0.2:
                     # Race started as small reduction in fuel level
                     # Set last fuel to 0 so know I have handled the start
                     self.lastFuel = 0
                     # reset data in case race restart
-                    self.penalties = []
+                    self.ledger.clearPending()
                     self.raceCompounds = []
                     self.raceCompounds.append(ac.getCarTyreCompound(0))
                     # Check fuel level and tyre compound
@@ -413,11 +738,13 @@ class driverInfo:
                     # Big change in fuel still settting things in UI so update start levels
                     self.startFuel = self.lastFuel
         #endregion Start Stuff
+        if timer is not None:
+            t = timer.lap(T_START, t)
         
         
         #region Tyre stuff (plus race end)
         if self.raceEnd is False:
-            if info.graphics.completedLaps == info.graphics.numberOfLaps or self.finishedRace is True:
+            if sim.graphics.completedLaps == sim.graphics.numberOfLaps or self.finishedRace is True:
                 # race complete.
                 self.raceEnd = True
                 # check at least two compounds used
@@ -425,192 +752,143 @@ class driverInfo:
                     if len(self.raceCompounds) < rules.minCompounds:
                         # issue compound penalty
                         penInfo = {
-                            "lap": info.graphics.numberOfLaps,
+                            "lap": sim.graphics.numberOfLaps,
                             "driver": ac.getDriverName(0),
                             "detail": "Driver did not use 2 compounds. (POST RACE)"
                             }
-                        self.timePenalties.append(penInfo)
+                        self.ledger.addTimed(penInfo)
                         announcePenalty(penInfo)
-                        ac.log(appName + ": Driver did not use %d compounds." % rules.minCompounds)
+                        log.info("Driver did not use %d compounds." % rules.minCompounds)
                 # announce any unserved penalties
                 for pen in self.penalties:
-                    ac.log(appName + ": Unserved Penalty, Lap: %d Detail: %s" % (pen["lap"], pen["detail"]))
-                    pen["detail"] = "UNSERVED %s (POST RACE)" % pen["detail"]
+                    log.info("Unserved Penalty, Lap: %d Detail: %s" % (pen["lap"], pen["detail"]))
+                for pen in self.ledger.markUnserved():
                     announcePenalty(pen)
+                self.ledger.flush()
+                if self.steward is not None:
+                    for pen in self.steward.raceEnd():
+                        logStewardPenalty(pen)
+                    announceStewardSummary()
             else:
                 # get current tyre and see if in list if not add
                 tyre = ac.getCarTyreCompound(0)
                 if not tyre in self.raceCompounds:
                     self.raceCompounds.append(tyre)
         #endregion Tyre stuff
+        if timer is not None:
+            t = timer.lap(T_TYRE, t)
         
         
         #region DRS stuff
-        curTime = time.time()
+        curTime = simTime
         clientCrossedDRS = -1 # index of DRS zone crossed during this update
 
-        driverList = []
-        for index in range(self.totalDrivers):
-            driver = {
-                "spline":       ac.getCarState(index, acsys.CS.NormalizedSplinePosition),       
-                "lastDRS":      0,
-                "DRStime":      0
-                }
-            
-            if len(self.lastList) > index:
-                # if lastList contains items copy items and check for DRS zone crossings
-                lastTick = self.lastList[index] # details about driver form last update
-                # copy relevant data
-                if lastTick is not None:
-                    driver["lastDRS"] = lastTick["lastDRS"]
-                    driver["DRStime"] = lastTick["DRStime"]
-                
-                #spline distance travelled
-                splineDist = driver["spline"] - lastTick["spline"]
-                
-                for id, zone in enumerate(drsData.zones):
-                    # loop over DRS data
-                    # check for crossing of any drs detection line
-                    if splineDist > -0.8:
-                        #not a new lap
-                        if driver["spline"] >= zone["detection"] and lastTick["spline"] < zone["detection"]:
-                            #driver crossed DRS detect line
-                            driver["lastDRS"] = id
-                            if index == 0:
-                                clientCrossedDRS = id
-                            elapsedTime = curTime - self.lastTime
-                            distTravelled = splineDist * self.trackLength
-                            avgSpd = elapsedTime/distTravelled
-                            distToLine = (zone["detection"] - lastTick["spline"]) * self.trackLength
-                            
-                            #set crossed time via interpolation
-                            driver["DRStime"] = self.lastTime + distToLine * avgSpd
-                            break
-                            
-                    elif zone["detection"] < 0.1:
-                        #new lap and zone just after S/F
-                        if driver["spline"] >= zone["detection"] and lastTick["spline"]-1 < zone["detection"]:
-                            #driver crossed DRS detect line
-                            driver["lastDRS"] = id
-                            if index == 0:
-                                clientCrossedDRS = id
-                            elapsedTime = curTime - self.lastTime
-                            distTravelled = (driver["spline"] + (1-lastTick["spline"])) * self.trackLength
-                            avgSpd = elapsedTime/distTravelled
-                            distToLine = (driver["spline"] - zone["detection"]) * self.trackLength
-                            
-                            #set crossed time via interpolation
-                            driver["DRStime"] = curTime - distToLine * avgSpd
-                            break
-                            
-                    elif zone["detection"] > 0.9:
-                        #new lap and zone just before S/F
-                        if driver["spline"] + 1 >= zone["detection"] and lastTick["spline"] < zone["detection"]:
-                            #driver crossed DRS detect line
-                            driver["lastDRS"] = id
-                            if index == 0:
-                                clientCrossedDRS = id
-                            elapsedTime = curTime - self.lastTime
-                            distTravelled = (driver["spline"] + (1-lastTick["spline"])) * self.trackLength
-                            avgSpd = elapsedTime/distTravelled
-                            distToLine = (zone["detection"] - lastTick["spline"]) * self.trackLength
-                            
-                            #set crossed time via interpolation
-                            driver["DRStime"] = self.lastTime + distToLine * avgSpd
-                            break
-                        
-            driverList.append(driver)
+        drivers = self.drivers
+        carCount = ac.getCarsCount()
+        if carCount != drivers.count:
+            # slots added or removed mid-session
+            drivers.resize(carCount)
+            if self.steward is not None:
+                self.steward.resize(carCount)
+        drivers.update(getSplinePosition, ac.isConnected)
+        
+        # check every driver for crossing of any drs detection line in one pass
+        crossings = drsData.detector.find(drivers.lastSpline, drivers.spline, self.lastTime, curTime)
+        for index, id, crossTime in crossings:
+            #driver crossed DRS detect line, time set via interpolation
+            drivers.crossed(index, id, crossTime)
+            if index == 0:
+                clientCrossedDRS = id
+        self.crossingLog.add(crossings)
+        
+        if self.steward is not None:
+            # same checks for every other car, from the crossings found above
+            for pen in self.steward.drsUpdate(crossings, drivers, drsData.index, self.crossingLog,
+                                              getDrs if settings.stewardDrs else None):
+                logStewardPenalty(pen)
+            for pen in self.steward.pitUpdate(ac.isCarInPitline, getSpeed):
+                log.info("Steward, penalty served. Car: %d Lap: %d Detail: %s" % (pen["car"], pen["lap"], pen["detail"]))
         
         if rules.drsGap > 0.0:         
             # Check if client crossed detection and within drsGap of another car
             if clientCrossedDRS != -1:
                 # ac.log("I crossed DRS")
-                myCar = driverList[0]
                 self.drsValid = False
                 self.inDrsZone = True
                 self.drsPenAwarded = False
                  
-                ac.setBackgroundTexture(self.drsIcon, imgPath + "red_box.png")
+                self.ui.setBackgroundTexture(self.drsIcon, imgPath + "red_box.png")
 
                 #DRS from lap x
-                if info.graphics.completedLaps+1 >= rules.drsEnabledLap:
+                if sim.graphics.completedLaps+1 >= rules.drsEnabledLap:
                     #check for 1s rule
-                    for index, car in enumerate(driverList):
-                        if index == 0:
-                            continue
-                        if car["lastDRS"] == myCar["lastDRS"] and myCar["DRStime"] - car["DRStime"] <= rules.drsGap:
-                            self.drsValid = True
-                            # ac.log("And I can use it :) car %d, gap %f. Me: %f other %f" % (index, (myCar["DRStime"] - car["DRStime"]), myCar["DRStime"], car["DRStime"]))
-                            ac.setBackgroundTexture(self.drsIcon, imgPath + "green_box.png")
-                            break
+                    ahead = self.crossingLog.carAhead(clientCrossedDRS, 0, drivers.DRStime[0], rules.drsGap)
+                    if ahead != -1:
+                        self.drsValid = True
+                        # ac.log("And I can use it :) car %d" % ahead)
+                        self.ui.setBackgroundTexture(self.drsIcon, imgPath + "green_box.png")
                 
             elif self.inDrsZone is True:
                 # Didnt cross a line and in a zone so check to see if I leave it and DRS used only if valid
-                zone  = drsData.zones[driverList[0]["lastDRS"]] # data of DRS zone in at last step
+                zoneId = drivers.lastDRS[0]
+                zone  = drsData.zones[zoneId] # data of DRS zone in at last step
                 
                 # Check DRS used correctly and penalty not already awarded for this zone
-                if info.physics.drs > 0 and self.drsValid is False and self.drsPenAwarded is False:
+                if sim.physics.drs > 0 and self.drsValid is False and self.drsPenAwarded is False:
                     # Give a penalty
                     self.drsPenAwarded = True
                     penInfo = {
-                        "lap": info.graphics.completedLaps + 1,
+                        "lap": sim.graphics.completedLaps + 1,
                         "driver": ac.getDriverName(0),
-                        "detail": ("Illegal DRS use, Zone %d" % (driverList[0]["lastDRS"] + 1))
+                        "detail": ("Illegal DRS use, Zone %d" % (drivers.lastDRS[0] + 1))
                         }
-                    self.penalties.append(penInfo)
-                    ac.log(appName + ": Illegal DRS use.")
+                    self.ledger.add(penInfo)
+                    log.info("Illegal DRS use.")
                     announcePenalty(penInfo)
                 
-                # Saftey check for end line near S/F. (not sure necessary)
-                if zone["end"] > 0.95 and driverList[0]["spline"] < 0.1:
+                # Turn off zone when leave, past the end line (including over S/F) or back to pit
+                if not drsData.index.inZone(zoneId, drivers.spline[0]):
                     self.inDrsZone = False
                     self.drsValid = False
                     self.drsPenAwarded = False
-                    ac.setBackgroundTexture(self.drsIcon, imgPath + "off_box.png")
-                # Turn off zone when leave
-                if driverList[0]["spline"] >= zone["end"] and self.lastList[0]["spline"] < zone["end"]:
-                    self.inDrsZone = False
-                    self.drsValid = False
-                    self.drsPenAwarded = False
-                    ac.setBackgroundTexture(self.drsIcon, imgPath + "off_box.png")
+                    self.ui.setBackgroundTexture(self.drsIcon, imgPath + "off_box.png")
                 
                 # Play a beep when crossing start line and DRS valid
-                if settings.beepOn and self.drsValid and driverList[0]["spline"] >= zone["start"] and self.lastList[0]["spline"] < zone["start"]:
-                    sound_player.play(audio)
-                    #stop in 0.5s (double beep)
-                    timer = threading.Timer(settings.beepLength, sound_player.stop)
-                    timer.start()
+                if settings.beepOn and self.drsValid and passed(zone["start"], drivers.lastSpline[0], drivers.spline[0]):
+                    sound_player.beep(settings.beepLength)
                 #else:
                 #    sound_player.stop()
-            elif info.physics.drs > 0:
+            elif sim.physics.drs > 0:
                 #enabled DRS at start of race or through back to pit
                 if self.lastDRSLevel == 0: 
                     #award penalty on opening only
                     penInfo = {
-                        "lap": info.graphics.completedLaps + 1,
+                        "lap": sim.graphics.completedLaps + 1,
                         "driver": ac.getDriverName(0),
                         "detail": ("Illegal DRS use, DRS opened without crossing detection line (Start or backToPit)")
                         }
-                    self.penalties.append(penInfo)
-                    ac.log(appName + ": Illegal DRS use.")
+                    self.ledger.add(penInfo)
+                    log.info("Illegal DRS use.")
                     announcePenalty(penInfo)
             
         # end of update save current values into lasts
+        updateTime = 1000 / self.updateRate(curTime - self.lastTime)
         self.lastTime = curTime
-        self.lastList = driverList
-        self.lastDRSLevel = info.physics.drs
+        self.lastDRSLevel = sim.physics.drs
         #endregion DRS stuff
+        if timer is not None:
+            t = timer.lap(T_DRS, t)
         
         
         #region Check penalty being served and for refuel
-        if info.graphics.isInPitLane:
+        if sim.graphics.isInPitLane:
             # Check pit fuel set if not set it
             if self.pitFuel <= 0.1:
-                self.pitFuel = info.physics.fuel
+                self.pitFuel = sim.physics.fuel
             # Check that if a driver has a penalty and not already voided.
             if len(self.penalties) > 0 and not self.penaltyVoid:
                 # Driver is taking a pit lane penalty.
-                if info.physics.speedKmh > 5:
+                if sim.physics.speedKmh > 5:
                     # Car has not stopped
                     self.servingPenalty = True
                 else:
@@ -622,45 +900,77 @@ class driverInfo:
             self.pitFuel = 0
                 
             # remove zeroth penalty
-            penServed = self.penalties.pop(0)
-            ac.log(appName + ": Penalty served. Pen lap: %d Detail: %s" % (penServed["lap"],penServed["detail"]))
+            penServed = self.ledger.serve()
+            log.info("Penalty served. Pen lap: %d Detail: %s" % (penServed["lap"],penServed["detail"]))
             self.servingPenalty = False
             self.penaltyVoid = False
         else:
             if self.pitFuel > 0:
                 #car left pits
-                if self.pitFuel < info.physics.fuel and rules.refuelling == 0:
+                if self.pitFuel < sim.physics.fuel and rules.refuelling == 0:
                     #car refuelled and its illegal to do so
                     penInfo = {
-                        "lap": info.graphics.completedLaps + 1,
+                        "lap": sim.graphics.completedLaps + 1,
                         "driver": ac.getDriverName(0),
                         "detail": "Driver refuelled (POST RACE)"
                         }
-                    self.timePenalties.append(penInfo)
+                    self.ledger.addTimed(penInfo)
                     announcePenalty(penInfo)
-                    ac.log(appName + ": Driver refuelled")
+                    log.info("Driver refuelled")
                 self.pitFuel = 0
                 
             self.servingPenalty = False
             self.penaltyVoid = False
         #endregion Check penalty being served
+        if timer is not None:
+            t = timer.lap(T_PIT, t)
         
         #region display penalties
         if len(self.penalties) > 0:
-            ac.setVisible(self.penIcon, 1)
-            ac.setVisible(self.penCounter, 1)
+            self.ui.setVisible(self.penIcon, 1)
+            self.ui.setVisible(self.penCounter, 1)
             if len(self.penalties) > 1:
-                ac.setText(self.penCounter, "%3d" % len(self.penalties))
+                self.ui.setText(self.penCounter, "%3d" % len(self.penalties))
             else:
-                ac.setText(self.penCounter, "")
+                self.ui.setText(self.penCounter, "")
         else:
-            ac.setVisible(self.penIcon, 0)
-            ac.setVisible(self.penCounter, 0)
+            self.ui.setVisible(self.penIcon, 0)
+            self.ui.setVisible(self.penCounter, 0)
         #endregion display penalties
+        if timer is not None:
+            t = timer.lap(T_DISPLAY, t)
+        
+    def updateRate(self, dt):
+        # updates per second until the next update. LineRate when the player is
+        # about to reach a start or end line, or a detection line that cars
+        # within the DRS gap ahead are crossing now, BaseRate otherwise.
+        drivers = self.drivers
+        moved = drivers.spline[0] - drivers.lastSpline[0]
+        if moved < -0.5:
+            # over S/F
+            moved += 1.0
+        if dt <= 0 or moved <= 0:
+            return settings.baseRate
+        speed = moved / dt
+        lookahead = settings.lineLookahead * speed
+        if drsData.index.toStartEnd(drivers.spline[0]) < lookahead:
+            return settings.lineRate
+        if drsData.index.toDetection(drivers.spline[0]) < lookahead + rules.drsGap * speed:
+            return settings.lineRate
+        return settings.baseRate
         
+    def clearLastRace(self):
+        # the journal key is the same for every race on a server, so penalties
+        # restored from it are only kept for the race they were given in
+        count = len(self.penalties) + len(self.timePenalties)
+        if count:
+            self.ledger.clearPending()
+            self.ledger.clearTimed()
+            log.info("Cleared %d penalties from the last race" % count)
+
     def raceStartCheck(self):
         
-        self.timePenalties = []
+        self.ledger.clearTimed()
         
         if rules.startQTyre==1 and rules.topXtyreInQ >= ac.getCarLeaderboardPosition(0):
             #check tyre as rule is on and quli postion in top X
@@ -670,9 +980,13 @@ class driverInfo:
                     "driver": ac.getDriverName(0),
                     "detail": "Incorrect starting tyre. (POST RACE)"
                     }
-                self.timePenalties.append(penInfo)
-                ac.log(appName + ": Incorrect starting tyre.")
+                self.ledger.addTimed(penInfo)
+                log.info("Incorrect starting tyre.")
                 announcePenalty(penInfo)
+        
+        if self.steward is not None:
+            for pen in self.steward.raceStart(ac.getCarLeaderboardPosition, ac.getCarTyreCompound):
+                logStewardPenalty(pen)
             
     def qualiUpdate(self):
     #update details for quali
@@ -687,41 +1001,46 @@ class driverInfo:
             #improved best time so update tyre info
             self.bestQLap = best
             self.qualiTyre = ac.getCarTyreCompound(0)
-            ac.setText(self.qTyreLabel, "Race Start Tyre: %s" % self.qualiTyre)
+            self.ui.setText(self.qTyreLabel, "Race Start Tyre: %s" % self.qualiTyre)
+        
+        if self.steward is not None:
+            self.steward.qualiUpdate(getBestLap, ac.getCarTyreCompound)
     
 class drs:
     def __init__(self):
         self.zones = []
         self.loadZones()
+        self.index = ZoneIndex(self.zones)
+        self.detector = CrossingDetector(self.index)
         self.valid = False
         
     def loadZones(self):
         try:
             track_name = ac.getTrackName(0)
             track_config = ac.getTrackConfiguration(0)
-            if track_config is not None:
-                drsIni = "content\\tracks\\%s\\%s\\%s" % (
-                    track_name, track_config, "data\\drs_zones.ini")
+            if track_config:
+                drsIni = os.path.join("content", "tracks", track_name, track_config, "data", "drs_zones.ini")
             else:
-                drsIni = "content\\tracks\\%s\\%s" % (
-                    track_name, "data\\drs_zones.ini")
+                drsIni = os.path.join("content", "tracks", track_name, "data", "drs_zones.ini")
             drsExists = os.path.isfile(drsIni)
 
             if drsExists:
-                config = configparser.ConfigParser()
-                config.read(drsIni)
-                # ac.log('zone sections: %s' % str(config.sections()))
-                for zone in config.sections():
+                # parsed and checked once per track and ini version
+                from lib.zone_cache import ZoneCache
+                zones, problems, cached = ZoneCache(zoneCachePath).load(track_name, track_config, drsIni)
+                for problem in problems:
+                    log.warning("drs_zones.ini problem, %s" % problem)
+                for detection, start, end in zones:
                     zone_info = {
-                        "detection": float(config[zone]['DETECTION']),
-                        "start": float(config[zone]['START']),
-                        "end": float(config[zone]['END'])
+                        "detection": detection,
+                        "start": start,
+                        "end": end
                     }
-                    ac.log(appName + ': zone %s' % str(zone_info))
+                    log.info('zone %s' % str(zone_info))
                     self.zones.append(zone_info)
             else:
-                ac.log(appName + ": could not find drs_zones.ini file")
+                log.warning("could not find drs_zones.ini file")
                 return False
         except Exception as e:
-            ac.log(appName + ": Error in loadDrsZones: %s" % e)
+            log.error("Error in loadDrsZones: %s" % e)
 
@@ -0,0 +1,6 @@
+# Headless harness for running AF_DRS outside Assetto Corsa.
+#
+# fake_ac        - stand-in `ac` and `acsys` modules
+# scenario       - scripted and recorded per-tick session data
+# run            - loads the app against the fakes and drives acMain/acUpdate
+# page_producer  - writes or reads synthetic shared memory page files
@@ -0,0 +1,55 @@
+# Python vs NumPy path of CrossingDetector per grid size, to place NUMPY_MIN_CARS.
+#
+#   python -m headless.bench_crossing
+#   python -m headless.bench_crossing --zones 4 --cars 20,40,60,100
+#
+# Each car moves a typical update's distance, so most calls find no crossing as
+# in a race. Times are the median of single calls in microseconds. The bisect
+# path does not depend on the number of zones, so the break-even is a car count.
+
+import argparse
+import random
+import time
+from array import array
+
+from lib.drs_crossing import CrossingDetector
+from lib.zone_index import ZoneIndex
+
+
+def median(call, count):
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[count // 2] * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time both CrossingDetector paths per grid size")
+    parser.add_argument("--zones", type=int, default=2)
+    parser.add_argument("--cars", default="10,20,30,40,50,60,80,100,150")
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    zones = [{"detection": 0.05 + 0.9 * i / args.zones, "start": 0.07 + 0.9 * i / args.zones,
+              "end": 0.09 + 0.9 * i / args.zones} for i in range(args.zones)]
+    index = ZoneIndex(zones)
+    python = CrossingDetector(index, useNumpy=False)
+    numpy = CrossingDetector(index)
+    if not numpy._loadNumpy():
+        print("numpy not available")
+        return
+    rand = random.Random(1)
+    print("cars  python us  numpy us")
+    for cars in [int(value) for value in args.cars.split(",")]:
+        last = array('d', [rand.random() for _ in range(cars)])
+        cur = array('d', [(spline + 0.0015) % 1.0 for spline in last])
+        p = median(lambda: python._findPython(last, cur, cars, 0.0, 0.1), args.calls)
+        n = median(lambda: numpy._findNumpy(last, cur, cars, 0.0, 0.1), args.calls)
+        print("%4d  %9.1f  %8.1f" % (cars, p, n))
+
+
+if __name__ == "__main__":
+    main()
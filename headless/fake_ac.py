@@ -0,0 +1,215 @@
+# Stand-in for the `ac` and `acsys` modules the game injects into python apps.
+# Only the calls AF_DRS uses are provided. Every call is counted so the cost of
+# talking to the game can be measured off-game.
+
+import collections
+
+
+class CS:
+    # acsys.CS car state ids (values are arbitrary, only identity matters here)
+    LapTime = 0
+    LastLap = 1
+    BestLap = 2
+    LapCount = 3
+    SpeedKMH = 4
+    NormalizedSplinePosition = 5
+    DriftPoints = 6
+    RaceFinished = 7
+    DrsAvailable = 8
+    DrsEnabled = 9
+
+
+class FakeAcsys:
+    CS = CS
+
+
+class FakeCar:
+    def __init__(self, index):
+        self.name = "af1_f3_evo"
+        self.driver = "Driver %d" % index
+        self.tyre = "S"
+        self.spline = 0.0
+        self.bestLap = 0
+        self.lapCount = 0
+        self.speedKmh = 0.0
+        self.position = index + 1
+        self.connected = True
+        self.drs = 0
+        self.inPitLane = False
+
+
+class FakeAc:
+    def __init__(self, carCount=1, trackName="headless_ring", trackConfig="", trackLength=5000.0,
+                 serverName="Headless", logEcho=False, logLimit=10000):
+        self.cars = [FakeCar(i) for i in range(carCount)]
+        self.trackName = trackName
+        self.trackConfig = trackConfig
+        self.trackLength = trackLength
+        self.serverName = serverName
+        self.logEcho = logEcho
+        self.logLines = collections.deque(maxlen=logLimit)
+        self.chat = []
+        self.calls = collections.Counter()
+        self.widgets = {}
+        self.renderCallbacks = []
+        self.chatListeners = []
+        self._nextId = 0
+
+    def deliverChat(self, msg, sender="SERVER"):
+        for callback in self.chatListeners:
+            callback(msg, sender)
+
+    def render(self, deltaT):
+        for callback in self.renderCallbacks:
+            callback(deltaT)
+
+    #region logging and chat
+    def log(self, msg):
+        self.calls["log"] += 1
+        self.logLines.append(msg)
+        if self.logEcho:
+            print(msg)
+        return 1
+
+    def console(self, msg):
+        return self.log(msg)
+
+    def sendChatMessage(self, msg):
+        self.calls["sendChatMessage"] += 1
+        self.chat.append(msg)
+        return 1
+    #endregion logging and chat
+
+    #region session and car data
+    def getCarsCount(self):
+        self.calls["getCarsCount"] += 1
+        return len(self.cars)
+
+    def getCarName(self, index):
+        self.calls["getCarName"] += 1
+        return self.cars[index].name
+
+    def getDriverName(self, index):
+        self.calls["getDriverName"] += 1
+        return self.cars[index].driver
+
+    def getCarTyreCompound(self, index):
+        self.calls["getCarTyreCompound"] += 1
+        return self.cars[index].tyre
+
+    def getCarLeaderboardPosition(self, index):
+        self.calls["getCarLeaderboardPosition"] += 1
+        return self.cars[index].position
+
+    def isConnected(self, index):
+        self.calls["isConnected"] += 1
+        return 1 if self.cars[index].connected else 0
+
+    def getCarState(self, index, state, *args):
+        self.calls["getCarState"] += 1
+        car = self.cars[index]
+        if state == CS.NormalizedSplinePosition:
+            return car.spline
+        if state == CS.BestLap:
+            return car.bestLap
+        if state == CS.LapCount:
+            return car.lapCount
+        if state == CS.SpeedKMH:
+            return car.speedKmh
+        if state == CS.DrsEnabled:
+            return car.drs
+        return 0
+
+    def isCarInPitline(self, index):
+        self.calls["isCarInPitline"] += 1
+        return 1 if self.cars[index].inPitLane else 0
+
+    def getServerName(self):
+        self.calls["getServerName"] += 1
+        return self.serverName
+
+    def getTrackName(self, index):
+        self.calls["getTrackName"] += 1
+        return self.trackName
+
+    def getTrackConfiguration(self, index):
+        self.calls["getTrackConfiguration"] += 1
+        return self.trackConfig
+
+    def getTrackLength(self, index):
+        self.calls["getTrackLength"] += 1
+        return self.trackLength
+    #endregion session and car data
+
+    #region ui
+    def _newWidget(self, kind, text=""):
+        self._nextId += 1
+        self.widgets[self._nextId] = {"kind": kind, "visible": 1, "text": text, "texture": "", "opacity": 1.0}
+        return self._nextId
+
+    def _set(self, call, widget, key, value):
+        self.calls[call] += 1
+        self.widgets[widget][key] = value
+        return 1
+
+    def newApp(self, name):
+        self.calls["newApp"] += 1
+        return self._newWidget("app", name)
+
+    def addButton(self, app, text):
+        self.calls["addButton"] += 1
+        return self._newWidget("button", text)
+
+    def addLabel(self, app, text):
+        self.calls["addLabel"] += 1
+        return self._newWidget("label", text)
+
+    def addRenderCallback(self, app, callback):
+        self.calls["addRenderCallback"] += 1
+        self.renderCallbacks.append(callback)
+        return 1
+
+    def addOnChatMessageListener(self, app, callback):
+        self.calls["addOnChatMessageListener"] += 1
+        self.chatListeners.append(callback)
+        return 1
+
+    def setVisible(self, widget, value):
+        return self._set("setVisible", widget, "visible", value)
+
+    def setText(self, widget, text):
+        return self._set("setText", widget, "text", text)
+
+    def setTitle(self, widget, text):
+        return self._set("setTitle", widget, "text", text)
+
+    def setBackgroundTexture(self, widget, path):
+        return self._set("setBackgroundTexture", widget, "texture", path)
+
+    def setBackgroundOpacity(self, widget, value):
+        return self._set("setBackgroundOpacity", widget, "opacity", value)
+
+    def setSize(self, widget, width, height):
+        return self._set("setSize", widget, "size", (width, height))
+
+    def setPosition(self, widget, x, y):
+        return self._set("setPosition", widget, "position", (x, y))
+
+    def setIconPosition(self, widget, x, y):
+        return self._set("setIconPosition", widget, "iconPosition", (x, y))
+
+    def setFontSize(self, widget, size):
+        return self._set("setFontSize", widget, "fontSize", size)
+
+    def setFontAlignment(self, widget, alignment):
+        return self._set("setFontAlignment", widget, "alignment", alignment)
+
+    def setCustomFont(self, widget, font, italic, bold):
+        return self._set("setCustomFont", widget, "font", (font, italic, bold))
+
+    def drawBorder(self, widget, value):
+        return self._set("drawBorder", widget, "border", value)
+
+    def drawBackground(self, widget, value):
+        return self._set("drawBackground", widget, "background", value)
+    #endregion ui
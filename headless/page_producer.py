@@ -0,0 +1,139 @@
+# Synthetic shared memory pages for stressing lib.sim_info without the game.
+#
+#   python -m headless.page_producer --dir /dev/shm/acpmf --seconds 60
+#   python -m headless.page_producer --dir /dev/shm/acpmf --consume --seconds 60
+#
+# The producer writes physics pages at the game's native rate (333 Hz) and
+# graphics pages every few physics steps, through FileBackend page files. Each
+# page is written field by field and packetId bumped last, like a game frame.
+# gas and brake always equal packetId % 1000 / 1000 so a reader can tell a torn
+# copy from a clean one.
+#
+# The consumer maps the same files and takes snapshots as fast as it can (or at
+# --rate), reporting snapshots per second, torn copies that snapshot() flagged,
+# torn copies it missed and skipped or repeated packets. Set ACPMF_DIR to the
+# same folder to have AF_DRS itself read the producer's pages.
+#
+# On a single core a producer preempted mid page leaves a stable half written
+# page, which no reader side check can tell apart from a clean one; expect
+# "torn missed" there. The check is meaningful with producer and consumer on
+# separate cores, as the game and the app are.
+
+import argparse
+import sys
+import time
+
+from lib.sim_info import SimInfo, FileBackend, AC_LIVE, AC_RACE
+
+
+def produce(info, seconds, rate=333.0, graphicsEvery=5, lapTime=90.0, trackLength=5000.0):
+    period = 1.0 / rate
+    physics = info.physics
+    graphics = info.graphics
+    info.static.trackSPlineLength = trackLength
+    info.static.numCars = 1
+    info.static.track = "headless_ring"
+    graphics.status = AC_LIVE
+    graphics.session = AC_RACE
+
+    start = time.perf_counter()
+    nextTick = start
+    step = 0
+    fuel = 60.0
+    late = 0
+    while True:
+        now = time.perf_counter()
+        if now - start >= seconds:
+            break
+        if now < nextTick:
+            time.sleep(nextTick - now)
+        elif now - nextTick > period:
+            late += 1
+        nextTick += period
+        step += 1
+        raceTime = step * period
+        fuel -= 0.03 * period
+
+        packet = physics.packetId + 1
+        check = (packet % 1000) / 1000.0
+        physics.gas = check
+        physics.fuel = fuel
+        physics.speedKmh = trackLength / lapTime * 3.6
+        physics.drs = 1.0 if (raceTime / lapTime) % 1.0 > 0.6 else 0.0
+        physics.brake = check
+        physics.packetId = packet
+
+        if step % graphicsEvery == 0:
+            distance = raceTime / lapTime
+            graphics.iCurrentTime = int((distance % 1.0) * lapTime * 1000)
+            graphics.completedLaps = int(distance)
+            graphics.normalizedCarPosition = distance % 1.0
+            graphics.distanceTraveled = distance * trackLength
+            graphics.packetId += 1
+    return step, late
+
+
+def consume(info, seconds, rate=None):
+    period = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    count = 0
+    flagged = 0
+    missed = 0
+    repeated = 0
+    skipped = 0
+    lastPacket = None
+    while time.perf_counter() - start < seconds:
+        snap = info.snapshot()
+        count += 1
+        physics = snap.physics
+        expected = (physics.packetId % 1000) / 1000.0
+        consistent = abs(physics.gas - expected) < 1e-6 and abs(physics.brake - expected) < 1e-6
+        if snap.torn:
+            flagged += 1
+        elif not consistent:
+            missed += 1
+        if lastPacket is not None:
+            if physics.packetId == lastPacket:
+                repeated += 1
+            elif physics.packetId > lastPacket + 1:
+                skipped += physics.packetId - lastPacket - 1
+        lastPacket = physics.packetId
+        if period:
+            time.sleep(period)
+    elapsed = time.perf_counter() - start
+    return {
+        "snapshots": count,
+        "perSecond": count / elapsed,
+        "flagged": flagged,
+        "missed": missed,
+        "repeated": repeated,
+        "skipped": skipped,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write or read synthetic AC shared memory pages")
+    parser.add_argument("--dir", required=True, help="folder holding the page files")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, default=None,
+                        help="producer: physics pages per second (333), consumer: snapshots per second (unlimited)")
+    parser.add_argument("--graphics-every", type=int, default=5, help="physics steps per graphics page")
+    parser.add_argument("--consume", action="store_true", help="read the pages instead of writing them")
+    args = parser.parse_args(argv)
+
+    info = SimInfo(FileBackend(args.dir))
+    try:
+        if args.consume:
+            result = consume(info, args.seconds, args.rate)
+            sys.stdout.write("snapshots: %d (%.0f/s)  torn flagged: %d  torn missed: %d  repeated: %d  skipped packets: %d\n" % (
+                result["snapshots"], result["perSecond"], result["flagged"], result["missed"],
+                result["repeated"], result["skipped"]))
+        else:
+            steps, late = produce(info, args.seconds, args.rate or 333.0, args.graphics_every)
+            sys.stdout.write("physics pages: %d (%.0f/s)  late steps: %d\n" % (steps, steps / args.seconds, late))
+    finally:
+        info.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# Re-run the rules over recorded sessions to see what a rules.ini change does.
+#
+#   python -m headless.readjudicate sessions/ --rules new_rules.ini
+#   python -m headless.readjudicate sessions/ --rules new_rules.ini --out diffs --workers 4
+#
+# Every trace in the folder (JSON lines from --record or telemetry .afr files)
+# is replayed through the app twice, once with the rules it was raced under and
+# once with the new rules. Telemetry files carry their rules in the header,
+# JSON traces are taken to have been raced under --baseline (the app's
+# rules.ini by default). The penalties that differ are written to
+# <out>/<session>.diff, "-" for penalties the new rules drop and "+" for ones
+# they add.
+#
+# Sessions run in a process pool, one session per task. Each replay reads its
+# trace record by record and a worker hands back only the penalty lists, so
+# memory does not grow with session length or count. Results are printed as
+# sessions finish, in completion order.
+
+import argparse
+import collections
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from headless.run import appDir, openSession, runSession
+from lib.config_cache import RULES
+
+TRACE_EXTENSIONS = ('.jsonl', '.afr')
+
+
+def findSessions(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.endswith(TRACE_EXTENSIONS))
+
+
+def writeRules(path, values):
+    # rules.ini from field values as in lib.config_cache.RULES
+    sections = collections.OrderedDict()
+    for name, section, option, kind, default in RULES:
+        if name in values:
+            sections.setdefault(section, []).append("%s=%s" % (option, values[name]))
+    with open(path, "w") as f:
+        for section, lines in sections.items():
+            f.write("[%s]\n%s\n\n" % (section, "\n".join(lines)))
+
+
+def recordedRules(path):
+    # rules stored in a telemetry header, None for traces without them
+    if not path.endswith('.afr'):
+        return None
+    from lib.telemetry import TelemetryReader
+    return TelemetryReader(path).meta.get("rules")
+
+
+def penaltyKeys(result):
+    return [(pen["lap"], pen["detail"]) for pen in result["penalties"] + result["timePenalties"]]
+
+
+def diffPenalties(before, after):
+    # (removed, added), each a sorted list of (lap, detail)
+    before = collections.Counter(before)
+    after = collections.Counter(after)
+    return sorted((before - after).elements()), sorted((after - before).elements())
+
+
+def readjudicate(task):
+    # worker: replay one session under both rule sets
+    path, baseline, rules, out = task
+    name = os.path.splitext(os.path.basename(path))[0]
+    scratch = tempfile.mkdtemp(prefix="afdrs_rules_")
+    try:
+        original = recordedRules(path)
+        if original is not None:
+            baseline = os.path.join(scratch, "original.ini")
+            writeRules(baseline, original)
+        before = penaltyKeys(runSession(openSession(path), render=False, rulesPath=baseline))
+        after = penaltyKeys(runSession(openSession(path), render=False, rulesPath=rules))
+        removed, added = diffPenalties(before, after)
+        diffPath = None
+        if removed or added:
+            diffPath = os.path.join(out, name + ".diff")
+            with open(diffPath, "w") as f:
+                for sign, pens in (("-", removed), ("+", added)):
+                    for lap, detail in pens:
+                        f.write("%s lap %d: %s\n" % (sign, lap, detail))
+        return {"session": name, "before": len(before), "after": len(after),
+                "removed": len(removed), "added": len(added), "diff": diffPath, "error": None}
+    except Exception as e:
+        return {"session": name, "error": "%s: %s" % (type(e).__name__, e)}
+    finally:
+        for entry in os.listdir(scratch):
+            os.remove(os.path.join(scratch, entry))
+        os.rmdir(scratch)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded sessions under new rules and diff the penalties")
+    parser.add_argument("sessions", help="folder of .jsonl traces and .afr telemetry files")
+    parser.add_argument("--rules", required=True, help="rules.ini to judge the sessions with")
+    parser.add_argument("--baseline", default=os.path.join(appDir, "rules.ini"),
+                        help="rules the JSON traces were raced under (default: the app's rules.ini)")
+    parser.add_argument("--out", default="readjudicated", help="folder for the per session diffs")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    sessions = findSessions(args.sessions)
+    if not sessions:
+        sys.stderr.write("no recorded sessions in %s\n" % args.sessions)
+        return 1
+    if not os.path.isdir(args.out):
+        os.makedirs(args.out)
+    rules = os.path.abspath(args.rules)
+    baseline = os.path.abspath(args.baseline)
+    out = os.path.abspath(args.out)
+    tasks = [(os.path.abspath(path), baseline, rules, out) for path in sessions]
+
+    changed = failed = 0
+    pool = multiprocessing.Pool(args.workers)
+    try:
+        for result in pool.imap_unordered(readjudicate, tasks):
+            if result["error"] is not None:
+                failed += 1
+                sys.stdout.write("%s: failed, %s\n" % (result["session"], result["error"]))
+            elif result["diff"] is None:
+                sys.stdout.write("%s: %d penalties, unchanged\n" % (result["session"], result["before"]))
+            else:
+                changed += 1
+                sys.stdout.write("%s: %d -> %d penalties (-%d +%d), %s\n" % (
+                    result["session"], result["before"], result["after"],
+                    result["removed"], result["added"], result["diff"]))
+            sys.stdout.flush()
+    finally:
+        pool.close()
+        pool.join()
+    sys.stdout.write("%d sessions, %d changed, %d failed\n" % (len(sessions), changed, failed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
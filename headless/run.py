@@ -0,0 +1,278 @@
+# Drive AF_DRS off-game as fast as the CPU allows.
+#
+#   python -m headless.run --cars 40 --laps 5
+#   python -m headless.run --replay session.jsonl
+#   python -m headless.run --cars 20 --record session.jsonl
+#   python -m headless.run --cars 20 --telemetry session.afr
+#   python -m headless.run --replay session.afr
+#
+# A throwaway Assetto Corsa root is built in a temp dir (the app folder is
+# linked in and the scenario's drs_zones.ini written out), the fake `ac` and
+# `acsys` modules are installed, lib.sim_info.info is replaced by pages in
+# process memory and AF_DRS is imported fresh.
+# time.time() inside the app is replaced by the scenario's clock so crossing
+# interpolation sees simulated rather than wall time.
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from headless.fake_ac import FakeAc, FakeAcsys
+from headless.scenario import ScriptedRace, RecordedSession, TelemetrySession, writeHeader, writeRecord
+
+from lib import sim_info
+from lib.gap_tracker import GapTracker
+
+appName = 'AF_DRS'
+appDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class VirtualClock:
+    # stands in for the time module inside the app
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.base = time.time()
+
+    def time(self):
+        return self.base + self.scenario.time
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def makeAcRoot(scenario, trackName, trackConfig=""):
+    root = tempfile.mkdtemp(prefix="afdrs_")
+    apps = os.path.join(root, "apps", "python")
+    os.makedirs(apps)
+    try:
+        os.symlink(appDir, os.path.join(apps, appName))
+    except (OSError, NotImplementedError):
+        shutil.copytree(appDir, os.path.join(apps, appName))
+
+    if trackConfig:
+        data = os.path.join(root, "content", "tracks", trackName, trackConfig, "data")
+    else:
+        data = os.path.join(root, "content", "tracks", trackName, "data")
+    os.makedirs(data)
+    with open(os.path.join(data, "drs_zones.ini"), "w") as ini:
+        ini.write(scenario.zonesIni())
+    return root
+
+
+def installFakes(fakeAc, simInfo):
+    sys.modules['ac'] = fakeAc
+    sys.modules['acsys'] = FakeAcsys()
+    sim_info.info = simInfo
+    if appDir not in sys.path:
+        sys.path.insert(0, appDir)
+
+
+def loadApp():
+    sys.modules.pop(appName, None)
+    import importlib
+    return importlib.import_module(appName)
+
+
+def openSession(path):
+    # recorded session from either a JSON lines trace or a binary telemetry file
+    with open(path, 'rb') as f:
+        magic = f.read(8)
+    if magic == b'AFDRSTEL':
+        return TelemetrySession(path)
+    return RecordedSession(path)
+
+
+def writePreferences(path, overrides):
+    # the app's preferences.ini with {section: {option: value}} replaced
+    import configparser
+    config = configparser.ConfigParser()
+    config.optionxform = str
+    config.read(os.path.join(appDir, "preferences.ini"))
+    for section, options in overrides.items():
+        if not config.has_section(section):
+            config.add_section(section)
+        for option, value in options.items():
+            config.set(section, option, str(value))
+    with open(path, "w") as f:
+        config.write(f)
+
+
+def runSession(scenario, carCount=None, maxTicks=None, render=True, recordPath=None,
+               telemetryPath=None, logEcho=False, trackName="headless_ring", trackConfig="",
+               journalPath=None, steward=False, rulesPath=None, timing=False):
+    carCount = carCount or scenario.carCount
+    fakeAc = FakeAc(carCount=carCount, trackName=trackName, trackConfig=trackConfig,
+                    trackLength=scenario.trackLength, logEcho=logEcho)
+    simInfo = sim_info.SimInfo(sim_info.MemoryBackend())
+    scenario.setup(fakeAc, simInfo)
+
+    root = makeAcRoot(scenario, trackName, trackConfig)
+    cwd = os.getcwd()
+    os.chdir(root)
+    record = open(recordPath, "w") if recordPath else None
+    try:
+        installFakes(fakeAc, simInfo)
+        app = loadApp()
+        app.time = VirtualClock(scenario)
+        # keep the penalty journal out of the app folder unless asked for
+        app.journalPath = os.path.join(cwd, journalPath) if journalPath else os.path.join(root, "penalties.journal")
+        app.manifestCache = os.path.join(root, "manifest.cache")
+        app.configCachePath = os.path.join(root, "config.cache")
+        app.zoneCachePath = os.path.join(root, "zones.cache")
+        if rulesPath is not None:
+            app.rulesPath = rulesPath
+        app.timingPath = os.path.join(root, "timing.csv")
+        overrides = {}
+        if steward:
+            overrides["Steward"] = {"Enabled": 1}
+        if timing:
+            overrides["Timing"] = {"Enabled": 1}
+        if overrides:
+            app.preferencesPath = os.path.join(root, "preferences.ini")
+            writePreferences(app.preferencesPath, overrides)
+
+        start = time.perf_counter()
+        app.acMain("headless")
+        if telemetryPath is not None:
+            app.startTelemetry(os.path.join(cwd, telemetryPath))
+        if record is not None:
+            writeHeader(record, scenario, fakeAc, simInfo)
+
+        # every car's distance/time samples in the race, for the gap report
+        tracker = GapTracker(carCount, getLap=lambda car: fakeAc.cars[car].lapCount)
+        inRace = False
+        frames = 0
+        processed = 0
+        updateTime = 0.0
+        while scenario.step(fakeAc, simInfo):
+            if record is not None:
+                writeRecord(record, scenario.time, fakeAc, simInfo)
+            tickStart = time.perf_counter()
+            app.acUpdate(scenario.dt)
+            updateTime += time.perf_counter() - tickStart
+            if render:
+                fakeAc.render(scenario.dt)
+            if simInfo.graphics.session == 2:
+                if not inRace:
+                    # cars moved to the grid
+                    tracker.reset()
+                    inRace = True
+                tracker.update(scenario.time, [car.spline for car in fakeAc.cars],
+                               [car.connected for car in fakeAc.cars])
+            else:
+                inRace = False
+            frames += 1
+            if app.lastUpdateTime == 0:
+                processed += 1
+            if maxTicks is not None and processed >= maxTicks:
+                break
+        wall = time.perf_counter() - start
+        # the last period, before shutdown writes it out
+        timings = app.timing.rows() if app.timing is not None else []
+        app.acShutdown()
+    finally:
+        os.chdir(cwd)
+        if record is not None:
+            record.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+    driverData = app.driverData
+    steward = driverData.steward if driverData is not None else None
+    # player's gap to the closest car ahead at its last pass of each detection line
+    gaps = []
+    if driverData is not None:
+        for id, zone in enumerate(app.drsData.zones):
+            ahead, gap = tracker.carAhead(0, zone["detection"])
+            gaps.append((id, ahead, gap))
+    # beeps play in real time, so ones queued while another plays are dropped
+    player = app.sound_player
+    beeps = len(getattr(player.backend, "played", ())) if player is not None else 0
+    return {
+        "app": app,
+        "ac": fakeAc,
+        "frames": frames,
+        "ticks": processed,
+        "simTime": scenario.time,
+        "wall": wall,
+        "updateTime": updateTime,
+        "ticksPerSecond": processed / updateTime if updateTime > 0 else 0.0,
+        "penalties": list(driverData.penalties) if driverData is not None else [],
+        "timePenalties": list(driverData.timePenalties) if driverData is not None else [],
+        "chat": list(fakeAc.chat),
+        "beeps": beeps,
+        "beepsDropped": player.dropped if player is not None else 0,
+        "uiSaved": driverData.ui.saved if driverData is not None else 0,
+        "chatMerged": app.chat.merged if app.chat is not None else 0,
+        "chatDropped": app.chat.dropped if app.chat is not None else 0,
+        "stewardPenalties": steward.awarded if steward is not None else None,
+        "detectionGaps": gaps,
+        "timing": timings,
+    }
+
+
+def printReport(result, out=sys.stdout):
+    out.write("frames: %d  processed ticks: %d  sim time: %.1fs  wall: %.2fs\n" % (
+        result["frames"], result["ticks"], result["simTime"], result["wall"]))
+    out.write("acUpdate: %.1f ticks/s (%.1f us/tick)\n" % (
+        result["ticksPerSecond"],
+        1e6 / result["ticksPerSecond"] if result["ticksPerSecond"] else 0.0))
+    out.write("penalties: %d  time penalties: %d  chat messages: %d  beeps: %d (%d dropped)\n" % (
+        len(result["penalties"]), len(result["timePenalties"]), len(result["chat"]),
+        result["beeps"], result["beepsDropped"]))
+    for pen in result["penalties"] + result["timePenalties"]:
+        out.write("  lap %d: %s\n" % (pen["lap"], pen["detail"]))
+    calls = result["ac"].calls
+    out.write("ac calls: %s\n" % ", ".join("%s=%d" % item for item in calls.most_common(8)))
+    out.write("widget calls skipped unchanged: %d\n" % result["uiSaved"])
+    out.write("chat messages merged: %d  dropped: %d\n" % (result["chatMerged"], result["chatDropped"]))
+    for id, ahead, gap in result["detectionGaps"]:
+        if gap is not None:
+            out.write("zone %d detection: car %d ahead by %.3fs\n" % (id + 1, ahead, gap))
+    for name, count, p50, p99, peak in result["timing"]:
+        out.write("  %-8s %6d  p50 %7.1f  p99 %7.1f  max %8.1f us\n" % (name, count, p50, p99, peak))
+    if result["stewardPenalties"] is not None:
+        out.write("steward penalties (other cars): %d\n" % result["stewardPenalties"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run AF_DRS headless against a scripted or recorded session")
+    parser.add_argument("--cars", type=int, default=20)
+    parser.add_argument("--laps", type=int, default=5)
+    parser.add_argument("--zones", default="0.10:0.15:0.30,0.55:0.60:0.75",
+                        help="comma separated detection:start:end triples")
+    parser.add_argument("--lap-time", type=float, default=90.0)
+    parser.add_argument("--fps", type=float, default=60.0, help="game frame rate fed to acUpdate")
+    parser.add_argument("--quali-laps", type=int, default=0)
+    parser.add_argument("--drs", choices=("always", "never"), default="always")
+    parser.add_argument("--pit-lap", type=int, default=None)
+    parser.add_argument("--refuel", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--replay", help="JSON lines trace or telemetry file to replay instead of a scripted race")
+    parser.add_argument("--record", help="write the scripted race to a JSON lines trace")
+    parser.add_argument("--telemetry", help="have the app record binary telemetry to this file")
+    parser.add_argument("--no-render", action="store_true")
+    parser.add_argument("--log", action="store_true", help="echo ac.log to stdout")
+    parser.add_argument("--steward", action="store_true", help="judge every car, not only the player")
+    parser.add_argument("--timing", action="store_true", help="time each update region (last period is printed)")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        scenario = openSession(args.replay)
+    else:
+        zones = [tuple(float(v) for v in zone.split(":")) for zone in args.zones.split(",") if zone]
+        scenario = ScriptedRace(cars=args.cars, laps=args.laps, zones=zones, lapTime=args.lap_time,
+                                dt=1.0 / args.fps, seed=args.seed, qualiLaps=args.quali_laps,
+                                drsMode=args.drs, pitLap=args.pit_lap, refuel=args.refuel)
+
+    result = runSession(scenario, maxTicks=args.max_ticks, render=not args.no_render,
+                        recordPath=args.record, telemetryPath=args.telemetry, logEcho=args.log,
+                        steward=args.steward, timing=args.timing)
+    printReport(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# Per-tick session data for the headless harness.
+#
+# A scenario owns the simulated clock. Each call to step() advances it by dt,
+# writes the new state into the fake `ac` module and the fake SimInfo pages and
+# returns False once the session is over.
+#
+# ScriptedRace generates a race from a handful of parameters, RecordedSession
+# replays a JSON lines trace (one record per tick, see writeRecord) and
+# TelemetrySession replays a binary recording made by lib.telemetry.
+
+import json
+import random
+
+from lib.telemetry import TelemetryReader
+
+
+class ScriptedRace:
+    def __init__(self, cars=20, laps=5, zones=((0.10, 0.15, 0.30), (0.55, 0.60, 0.75)),
+                 trackLength=5000.0, lapTime=90.0, dt=1.0/60, seed=1, preStart=2.0,
+                 qualiLaps=0, drsMode="always", pitLap=None, refuel=False, startFuel=60.0,
+                 finishHold=2.0):
+        self.carCount = cars
+        self.laps = laps
+        self.zones = [tuple(zone) for zone in zones]
+        self.trackLength = trackLength
+        self.lapTime = lapTime
+        self.dt = dt
+        self.preStart = preStart
+        self.qualiLaps = qualiLaps
+        self.drsMode = drsMode  # "always" opens DRS in every zone, "never" keeps it shut
+        self.pitLap = pitLap
+        self.refuel = refuel
+        self.startFuel = startFuel
+        self.finishHold = finishHold    # seconds the finish is held, longer than 1 / BaseRate
+        self.finishTime = 0.0
+        self.random = random.Random(seed)
+        self.time = 0.0
+        self.raceTime = 0.0
+        self.session = 1 if qualiLaps > 0 else 2
+        self.lapStart = 0.0     # session time the player's current lap started
+        self.lapCount = 0
+        self.dist = []
+        self.speed = []
+        self.fuel = startFuel
+        self.finished = False
+
+    def setup(self, ac, info):
+        ac.trackLength = self.trackLength
+        info.static.numCars = self.carCount
+        info.static.trackSPlineLength = self.trackLength
+        info.graphics.numberOfLaps = self.laps
+        # cars lined up behind the S/F line, slightly different pace each
+        self.dist = [-0.002 * (index + 1) for index in range(self.carCount)]
+        self.speed = [1.0 / (self.lapTime * (1.0 + 0.01 * self.random.random())) for _ in range(self.carCount)]
+        if self.session == 1:
+            self.dist = [0.0] * self.carCount
+        self._write(ac, info)
+
+    def zonesIni(self):
+        lines = []
+        for index, (detection, start, end) in enumerate(self.zones):
+            lines.append("[ZONE_%d]" % index)
+            lines.append("DETECTION=%f" % detection)
+            lines.append("START=%f" % start)
+            lines.append("END=%f" % end)
+            lines.append("")
+        return "\n".join(lines)
+
+    def step(self, ac, info):
+        if self.finished:
+            return False
+        self.time += self.dt
+        if self.session == 1:
+            self._moveCars(self.dt)
+            if int(self.dist[0]) >= self.qualiLaps:
+                # quali over, line the grid up for the race
+                self.session = 2
+                self.dist = [-0.002 * (index + 1) for index in range(self.carCount)]
+                self.raceTime = 0.0
+                self.fuel = self.startFuel
+                self.lapStart = 0.0
+                self.lapCount = 0
+                info.graphics.iLastTime = 0
+        else:
+            self.raceTime += self.dt
+            if int(self.dist[0]) >= self.laps:
+                # cars stop at the flag, the app only updates at BaseRate away from
+                # the lines so hold the finish long enough for it to see the last lap
+                self.finishTime += self.dt
+                self.finished = self.finishTime >= self.finishHold
+            elif self.raceTime > self.preStart:
+                self._moveCars(self.dt)
+                self.fuel -= 0.001
+        self._write(ac, info)
+        return True
+
+    def _moveCars(self, dt):
+        for index in range(self.carCount):
+            speed = self.speed[index]
+            if index == 0 and self._inPit():
+                speed *= 0.3
+            self.dist[index] += speed * dt * (0.98 + 0.04 * self.random.random())
+
+    def _inPit(self):
+        if self.session != 2 or self.pitLap is None:
+            return False
+        lap = int(self.dist[0])
+        return lap == self.pitLap and self.dist[0] - lap < 0.05
+
+    def _inZone(self, spline):
+        for detection, start, end in self.zones:
+            if start <= spline < end:
+                return True
+        return False
+
+    def _write(self, ac, info):
+        player = self.dist[0]
+        for index, car in enumerate(ac.cars):
+            car.spline = self.dist[index] % 1.0
+            car.lapCount = max(0, int(self.dist[index]))
+            car.speedKmh = self.speed[index] * self.trackLength * 3.6
+            car.drs = 1 if self.drsMode == "always" and self.session == 2 and self._inZone(car.spline) else 0
+        if self.session == 1:
+            laps = int(player)
+            if laps > 0:
+                best = int(self.lapTime * 1000) - laps
+                ac.cars[0].bestLap = best
+        inPit = self._inPit()
+        ac.cars[0].inPitLane = inPit
+        if inPit and self.refuel:
+            self.fuel += 0.01
+
+        info.graphics.session = self.session
+        info.graphics.packetId += 1
+        info.physics.packetId += 1
+        info.graphics.completedLaps = max(0, int(player))
+        info.graphics.normalizedCarPosition = player % 1.0
+        info.graphics.isInPitLane = 1 if inPit else 0
+        # lap timer, iLastTime holds the lap just completed
+        if self.session == 2:
+            now = max(0.0, self.raceTime - self.preStart)
+        else:
+            now = self.time
+        laps = max(0, int(player))
+        if laps != self.lapCount:
+            info.graphics.iLastTime = int((now - self.lapStart) * 1000)
+            self.lapStart = now
+            self.lapCount = laps
+        info.graphics.iCurrentTime = int((now - self.lapStart) * 1000)
+        info.physics.fuel = self.fuel
+        info.physics.speedKmh = ac.cars[0].speedKmh * (0.3 if inPit else 1.0)
+        if self.drsMode == "always" and self.session == 2 and self._inZone(player % 1.0):
+            info.physics.drs = 1.0
+        else:
+            info.physics.drs = 0.0
+
+
+class RecordedSession:
+    def __init__(self, path, dt=None):
+        self.path = path
+        self.dt = dt
+        self.time = 0.0
+        self.zones = []
+        self.trackLength = 5000.0
+        self.carCount = 0
+        self._file = open(path, "r")
+        header = json.loads(self._file.readline())
+        self.zones = [tuple(zone) for zone in header.get("zones", [])]
+        self.trackLength = header.get("trackLength", self.trackLength)
+        self.carCount = header.get("cars", 0)
+        self.laps = header.get("laps", 0)
+        if self.dt is None:
+            self.dt = header.get("dt", 1.0/60)
+
+    def zonesIni(self):
+        return ScriptedRace(cars=0, zones=self.zones).zonesIni()
+
+    def setup(self, ac, info):
+        ac.trackLength = self.trackLength
+        info.static.numCars = self.carCount
+        info.static.trackSPlineLength = self.trackLength
+        info.graphics.numberOfLaps = self.laps
+
+    def step(self, ac, info):
+        line = self._file.readline()
+        if not line:
+            self._file.close()
+            return False
+        record = json.loads(line)
+        self.time = record["t"]
+        for index, spline in enumerate(record["splines"]):
+            ac.cars[index].spline = spline
+        for index, tyre in enumerate(record.get("tyres", [])):
+            ac.cars[index].tyre = tyre
+        ac.cars[0].bestLap = record.get("bestLap", 0)
+        info.graphics.session = record["session"]
+        info.graphics.completedLaps = record["completedLaps"]
+        info.graphics.iCurrentTime = record["iCurrentTime"]
+        info.graphics.iLastTime = record.get("iLastTime", 0)
+        info.graphics.isInPitLane = record["isInPitLane"]
+        info.graphics.packetId += 1
+        info.physics.packetId += 1
+        info.physics.fuel = record["fuel"]
+        info.physics.drs = record["drs"]
+        info.physics.speedKmh = record["speedKmh"]
+        return True
+
+
+class TelemetrySession:
+    def __init__(self, path):
+        self.path = path
+        self.reader = TelemetryReader(path)
+        meta = self.reader.meta
+        self.zones = [(zone["detection"], zone["start"], zone["end"]) for zone in meta.get("zones", [])]
+        self.trackLength = meta.get("trackLength", 5000.0)
+        self.carCount = self.reader.carCount
+        self.drivers = meta.get("drivers", [])
+        self.dt = 1.0/30
+        self.time = 0.0
+        self._records = iter(self.reader)
+        self._start = None
+
+    def zonesIni(self):
+        return ScriptedRace(cars=0, zones=self.zones).zonesIni()
+
+    def setup(self, ac, info):
+        ac.trackLength = self.trackLength
+        for index, name in enumerate(self.drivers[:len(ac.cars)]):
+            ac.cars[index].driver = name
+        info.static.numCars = self.carCount
+        info.static.trackSPlineLength = self.trackLength
+
+    def step(self, ac, info):
+        record = next(self._records, None)
+        if record is None:
+            return False
+        if self._start is None:
+            self._start = record["time"]
+        # feed the recorded update interval so every record is processed once
+        recorded = record["time"] - self._start
+        self.dt = max(recorded - self.time, 1.0/30)
+        self.time = recorded
+        for index, spline in enumerate(record["splines"]):
+            ac.cars[index].spline = spline
+        ac.cars[0].tyre = record["tyre"]
+        ac.cars[0].bestLap = record["bestLap"]
+        for key, value in record.items():
+            if key.startswith("physics."):
+                setattr(info.physics, key[8:], value)
+            elif key.startswith("graphics."):
+                setattr(info.graphics, key[9:], value)
+        return True
+
+
+def writeHeader(fh, scenario, ac, info):
+    fh.write(json.dumps({
+        "zones": scenario.zones,
+        "trackLength": ac.trackLength,
+        "cars": len(ac.cars),
+        "laps": info.graphics.numberOfLaps,
+        "dt": scenario.dt}) + "\n")
+
+
+def writeRecord(fh, t, ac, info):
+    fh.write(json.dumps({
+        "t": t,
+        "session": info.graphics.session,
+        "completedLaps": info.graphics.completedLaps,
+        "iCurrentTime": info.graphics.iCurrentTime,
+        "iLastTime": info.graphics.iLastTime,
+        "isInPitLane": info.graphics.isInPitLane,
+        "fuel": info.physics.fuel,
+        "drs": info.physics.drs,
+        "speedKmh": info.physics.speedKmh,
+        "bestLap": ac.cars[0].bestLap,
+        "splines": [car.spline for car in ac.cars],
+        "tyres": [car.tyre for car in ac.cars]}) + "\n")
@@ -0,0 +1,83 @@
+# Outbound chat messages, queued and sent within a rate budget.
+#
+# post() only queues the message. A scheduler timer sends them later, on the
+# update thread (the ac API is not called from other threads), at most rate
+# messages per second with bursts of up to burst messages (a token bucket).
+# Messages with a key (a penalty's lap and detail) are coalesced: a message
+# whose key is still queued is merged into it and the line goes out with
+# " (xN)" when it stood for N messages. When more than maxQueued messages are
+# waiting, new ones are dropped and passed to warn. flush() sends whatever is
+# left without the budget, for shutdown.
+#
+# send is any callable taking the message, ac.sendChatMessage in the game.
+
+
+class ChatQueue:
+    def __init__(self, send, scheduler, rate=1.0, burst=3, maxQueued=20, warn=None):
+        self.send = send
+        self.scheduler = scheduler
+        self.rate = rate
+        self.burst = burst
+        self.maxQueued = maxQueued
+        self.warn = warn        # called with a line for each dropped message
+        self.queue = []         # [key, message, count] in send order
+        self.queuedKeys = {}    # key -> queue entry
+        self.tokens = float(burst)
+        self.lastRefill = scheduler.time
+        self.timer = None
+        self.sent = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def post(self, msg, key=None):
+        entry = self.queuedKeys.get(key) if key is not None else None
+        if entry is not None:
+            entry[2] += 1
+            self.merged += 1
+            return
+        if len(self.queue) >= self.maxQueued:
+            self.dropped += 1
+            if self.warn is not None:
+                self.warn("Chat queue full, message dropped: %s" % msg)
+            return
+        entry = [key, msg, 1]
+        self.queue.append(entry)
+        if key is not None:
+            self.queuedKeys[key] = entry
+        if self.timer is None:
+            self.timer = self.scheduler.after(0, self._drain)
+        elif not self.timer.active:
+            self.timer.rearm(0)
+
+    def _refill(self):
+        now = self.scheduler.time
+        self.tokens = min(float(self.burst), self.tokens + (now - self.lastRefill) * self.rate)
+        self.lastRefill = now
+
+    def _sendNext(self):
+        key, msg, count = self.queue.pop(0)
+        if key is not None:
+            del self.queuedKeys[key]
+        if count > 1:
+            msg = "%s (x%d)" % (msg, count)
+        self.sent += 1
+        self.send(msg)
+
+    def _drain(self):
+        self._refill()
+        while self.queue and self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self._sendNext()
+        if self.queue:
+            # wait for the next token
+            self.timer.rearm((1.0 - self.tokens) / self.rate)
+
+    def flush(self):
+        # send everything still queued now, outside the budget
+        while self.queue:
+            self._sendNext()
+        if self.timer is not None:
+            self.timer.cancel()
+
+    def __len__(self):
+        return len(self.queue)
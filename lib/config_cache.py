@@ -0,0 +1,140 @@
+# preferences.ini and rules.ini compiled into immutable typed values.
+#
+# A spec lists the fields of a file as (name, section, option, type, default).
+# type is 'int', 'float' or 'items' (the values of every option in the
+# section, option is None). A default of REQUIRED makes a missing option an
+# error. load() parses the file with configparser, converts every field and
+# returns a namedtuple, so a bad value fails the whole file instead of leaving
+# half of it loaded.
+#
+# The converted values are kept in a marshal cache next to the app (marshal is
+# built in, json would pull in re), keyed by the file's size and mtime and the
+# spec's field names. As long as neither changed, load() reads the cache and
+# configparser is never imported. stamp() is the cheap check used to notice a
+# file was edited and reload it. MarshalCache is the cache file itself, also
+# used by lib.zone_cache.
+
+from collections import namedtuple
+import marshal
+import os
+
+REQUIRED = object()
+
+PREFERENCES = [
+    ('opacity', 'Main', 'BackgroundOpacity', 'float', REQUIRED),
+    ('border', 'Main', 'Border', 'int', REQUIRED),
+    ('scale', 'Main', 'AppScale', 'float', REQUIRED),
+    ('minimal', 'Main', 'Minimal', 'int', REQUIRED),
+    ('beepEnabled', 'Beep', 'BeepEnabled', 'int', REQUIRED),
+    ('beepLength', 'Beep', 'BeepLength', 'float', REQUIRED),
+    ('baseRate', 'Update', 'BaseRate', 'float', 10.0),
+    ('lineRate', 'Update', 'LineRate', 'float', 60.0),
+    ('lineLookahead', 'Update', 'LineLookahead', 'float', 1.0),
+    ('chatRate', 'Chat', 'MessagesPerSecond', 'float', 1.0),
+    ('chatBurst', 'Chat', 'Burst', 'int', 3),
+    ('steward', 'Steward', 'Enabled', 'int', 0),
+    ('stewardDrs', 'Steward', 'ReadDRS', 'int', 1),
+    ('telemetry', 'Telemetry', 'Record', 'int', 0),
+    ('timing', 'Timing', 'Enabled', 'int', 0),
+    ('timingInterval', 'Timing', 'DumpEvery', 'float', 30.0),
+    ('logLevel', 'Log', 'Level', 'int', 1),
+    ('logFlush', 'Log', 'FlushEvery', 'float', 1.0),
+    ('cars', 'Cars', None, 'items', REQUIRED),
+    ('servers', 'Servers', None, 'items', REQUIRED),
+    ]
+
+RULES = [
+    ('minCompounds', 'Rules', 'MinTyreCompounds', 'int', REQUIRED),
+    ('startQTyre', 'Rules', 'startOnBestQualiTyre', 'int', REQUIRED),
+    ('topXtyreInQ', 'Rules', 'topXqualiTyre', 'int', REQUIRED),
+    ('refuelling', 'Rules', 'RefuellingAllowed', 'int', REQUIRED),
+    ('drsGap', 'Rules', 'DRSActivationTime', 'float', REQUIRED),
+    ('drsEnabledLap', 'Rules', 'DRSEnabledLap', 'int', REQUIRED),
+    ]
+
+Preferences = namedtuple('Preferences', [field[0] for field in PREFERENCES])
+Rules = namedtuple('Rules', [field[0] for field in RULES])
+
+
+def stamp(path):
+    # [size, mtime] of path, None if it can't be read
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime]
+
+
+def parse(path, spec):
+    # field values of path, converted and checked
+    import configparser
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        raise IOError("could not read %s" % path)
+    values = {}
+    for name, section, option, kind, default in spec:
+        if kind == 'items':
+            if not config.has_section(section):
+                if default is REQUIRED:
+                    raise ValueError("[%s] missing in %s" % (section, path))
+                values[name] = list(default)
+                continue
+            values[name] = [value for key, value in config.items(section)]
+        elif not config.has_option(section, option):
+            if default is REQUIRED:
+                raise ValueError("%s in [%s] missing in %s" % (option, section, path))
+            values[name] = default
+        elif kind == 'int':
+            values[name] = config.getint(section, option)
+        else:
+            values[name] = config.getfloat(section, option)
+    return values
+
+
+class MarshalCache:
+    # dict of entries in a marshal file, each built from a source file and
+    # stored with its stamp. A missing or unreadable cache starts empty.
+    def __init__(self, cachePath):
+        self.cachePath = cachePath
+        self.hits = 0       # lookups answered from the cache
+        try:
+            with open(cachePath, 'rb') as f:
+                self.entries = marshal.load(f)
+        except (IOError, OSError, ValueError, EOFError, TypeError):
+            self.entries = {}
+        if not isinstance(self.entries, dict):
+            self.entries = {}
+
+    def lookup(self, key, path, **match):
+        # (entry, stamp of path): entry is None unless the one cached under key
+        # was built from path as it is now and has the match values
+        current = stamp(path)
+        entry = self.entries.get(key)
+        if current is None or entry is None or entry["stamp"] != current:
+            return None, current
+        for name, value in match.items():
+            if entry.get(name) != value:
+                return None, current
+        self.hits += 1
+        return entry, current
+
+    def store(self, key, entry):
+        self.entries[key] = entry
+        try:
+            with open(self.cachePath, 'wb') as f:
+                marshal.dump(self.entries, f)
+        except (IOError, OSError):
+            # built fine, the next session builds again
+            pass
+
+
+class ConfigCache(MarshalCache):
+    def load(self, path, spec, cls):
+        # cls(...) of the file's values, from the cache while the file is unchanged
+        fields = [field[0] for field in spec]
+        entry, current = self.lookup(path, path, fields=fields)
+        if entry is not None:
+            return cls(**entry["values"])
+        values = parse(path, spec)
+        self.store(path, {"stamp": current, "fields": fields, "values": values})
+        return cls(**values)
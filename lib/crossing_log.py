@@ -0,0 +1,85 @@
+# Recent detection line crossings per DRS zone, for the DRS gap check.
+#
+# Each zone keeps a fixed size ring buffer of (time, car) in time order.
+# Crossings older than the window are evicted as new ones arrive, so a match can
+# only come from the current pass of the line, never from an earlier lap.
+# "Did another car cross this line within gap before me" is a bisect on the
+# times followed by a scan of the few crossings inside the gap.
+
+from array import array
+
+
+class ZoneCrossings:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array('d', [0.0]) * capacity
+        self.cars = array('i', [-1]) * capacity
+        self.head = 0   # slot of the oldest crossing
+        self.size = 0
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+
+    def _time(self, pos):
+        # time of the pos'th oldest crossing
+        return self.times[(self.head + pos) % self.capacity]
+
+    def add(self, car, crossTime, window):
+        if self.size and crossTime < self._time(self.size - 1):
+            # clock went backwards (session restart), old crossings are meaningless
+            self.clear()
+        self.evict(crossTime - window)
+        if self.size == self.capacity:
+            # full, drop the oldest
+            self.head = (self.head + 1) % self.capacity
+            self.size -= 1
+        slot = (self.head + self.size) % self.capacity
+        self.times[slot] = crossTime
+        self.cars[slot] = car
+        self.size += 1
+
+    def evict(self, before):
+        while self.size and self.times[self.head] < before:
+            self.head = (self.head + 1) % self.capacity
+            self.size -= 1
+
+    def bisect(self, crossTime):
+        # position of the first crossing at or after crossTime
+        lo = 0
+        hi = self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._time(mid) < crossTime:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def carAhead(self, car, crossTime, gap):
+        # index of a car other than car that crossed within gap before crossTime, -1 if none
+        for pos in range(self.bisect(crossTime - gap), self.size):
+            slot = (self.head + pos) % self.capacity
+            if self.times[slot] > crossTime:
+                break
+            if self.cars[slot] != car:
+                return self.cars[slot]
+        return -1
+
+
+class CrossingLog:
+    def __init__(self, zoneCount, carCount, window):
+        # room for every car crossing each line several times inside the window
+        capacity = max(64, 4 * carCount)
+        self.window = window
+        self.zones = [ZoneCrossings(capacity) for _ in range(zoneCount)]
+
+    def add(self, crossings):
+        # crossings from one update as (car, zone, time), added in time order
+        if len(crossings) > 1:
+            crossings = sorted(crossings, key=lambda crossing: crossing[2])
+        for car, zone, crossTime in crossings:
+            self.zones[zone].add(car, crossTime, self.window)
+
+    def carAhead(self, zone, car, crossTime, gap):
+        return self.zones[zone].carAhead(car, crossTime, gap)
@@ -0,0 +1,73 @@
+# Per-driver DRS tracking state kept in preallocated array columns.
+#
+# One slot per car index, sized to ac.getCarsCount(). The current and previous
+# spline columns are double buffered: update() swaps them and refills the
+# current one in place, so a tick allocates no per-driver objects.
+#
+# Cars that join a slot mid-session start with no previous sample (their last
+# spline is set to the current one, so no crossing can be seen on that tick) and
+# no detection line crossed. Cars that leave have their crossing cleared so a
+# stale time cannot be matched by the DRS gap check.
+
+from array import array
+
+NO_ZONE = -1    # lastDRS value of a driver that has not crossed a detection line
+
+
+class DriverStore:
+    def __init__(self, count=0):
+        self.count = 0
+        self.spline = array('d')        # spline position this update
+        self.lastSpline = array('d')    # spline position previous update
+        self.lastDRS = array('i')       # index of last detection line crossed
+        self.DRStime = array('d')       # interpolated time of that crossing
+        self.connected = array('b')     # slot had a driver at the last update
+        self.resize(count)
+
+    def resize(self, count):
+        # grow or shrink keeping the state of slots that remain
+        if count > self.count:
+            extra = count - self.count
+            self.spline.extend(array('d', [0.0]) * extra)
+            self.lastSpline.extend(array('d', [0.0]) * extra)
+            self.lastDRS.extend(array('i', [NO_ZONE]) * extra)
+            self.DRStime.extend(array('d', [0.0]) * extra)
+            self.connected.extend(array('b', [0]) * extra)
+        elif count < self.count:
+            for column in (self.spline, self.lastSpline, self.lastDRS, self.DRStime, self.connected):
+                del column[count:]
+        self.count = count
+
+    def reset(self):
+        # treat every slot as newly joined at the next update
+        for index in range(self.count):
+            self.connected[index] = 0
+            self.lastDRS[index] = NO_ZONE
+            self.DRStime[index] = 0.0
+
+    def update(self, getSpline, isConnected):
+        # swap buffers, then read every car's spline position into the current one
+        self.spline, self.lastSpline = self.lastSpline, self.spline
+        spline = self.spline
+        lastSpline = self.lastSpline
+        connected = self.connected
+        for index in range(self.count):
+            if isConnected(index):
+                spline[index] = getSpline(index)
+                if not connected[index]:
+                    # new driver in this slot, nothing to compare against yet
+                    connected[index] = 1
+                    lastSpline[index] = spline[index]
+                    self.lastDRS[index] = NO_ZONE
+                    self.DRStime[index] = 0.0
+            else:
+                if connected[index]:
+                    # driver left, forget their crossing
+                    connected[index] = 0
+                    self.lastDRS[index] = NO_ZONE
+                    self.DRStime[index] = 0.0
+                spline[index] = lastSpline[index]
+
+    def crossed(self, index, zone, crossTime):
+        self.lastDRS[index] = zone
+        self.DRStime[index] = crossTime
@@ -0,0 +1,105 @@
+# DRS detection line crossing checks for every car in one call.
+#
+# find() returns a (carIndex, zoneId, crossTime) tuple for each car that crossed
+# a detection line between the last update and this one. When several lines are
+# crossed in one update the zone listed first in drs_zones.ini wins, matching
+# the original per car loop in driverInfo.raceUpdate. Crossing times are
+# interpolated assuming constant speed between the two updates, as a fraction
+# of the spline distance covered, so the track length is not needed (a track
+# reporting a length of 0 used to divide by zero here).
+#
+# The python path asks the sorted ZoneIndex which line (if any) lies between
+# each car's last and current spline position. NumPy is optional. AC's embedded
+# python normally does not ship it, in which case (or for grids below
+# NUMPY_MIN_CARS, where array setup costs more than it saves, see
+# headless/bench_crossing.py) the python path is used. Both paths give identical
+# results.
+
+from lib.zone_index import NEW_LAP, NEAR_AFTER_SF, NEAR_BEFORE_SF
+
+numpy = None        # imported on first use, it is slow to load
+NUMPY_MIN_CARS = 40  # grid size below which the bisect path is faster (measured break-even)
+
+
+class CrossingDetector:
+    def __init__(self, index, useNumpy=True):
+        self.index = index
+        self.detections = [float(zone["detection"]) for zone in index.zones]   # by zone id
+        self.useNumpy = useNumpy
+        self._det = None
+
+    def _loadNumpy(self):
+        # False if numpy is not available
+        global numpy
+        if numpy is None:
+            try:
+                import numpy
+            except ImportError:
+                self.useNumpy = False
+                return False
+        self._det = numpy.array(self.detections, dtype=numpy.float64)
+        self._afterSF = self._det < NEAR_AFTER_SF
+        self._beforeSF = ~self._afterSF & (self._det > NEAR_BEFORE_SF)
+        return True
+
+    def find(self, lastSplines, splines, lastTime, curTime):
+        count = min(len(lastSplines), len(splines))
+        if count == 0 or not self.detections:
+            return []
+        if self.useNumpy and count >= NUMPY_MIN_CARS and (self._det is not None or self._loadNumpy()):
+            return self._findNumpy(lastSplines, splines, count, lastTime, curTime)
+        return self._findPython(lastSplines, splines, count, lastTime, curTime)
+
+    def _findPython(self, lastSplines, splines, count, lastTime, curTime):
+        crossings = []
+        elapsedTime = curTime - lastTime
+        crossed = self.index.crossed
+        for index in range(count):
+            last = lastSplines[index]
+            cur = splines[index]
+            id = crossed(last, cur)
+            if id == -1:
+                continue
+            detection = self.detections[id]
+            splineDist = cur - last
+            if splineDist > NEW_LAP:
+                #not a new lap
+                crossings.append((index, id, lastTime + (detection - last) / splineDist * elapsedTime))
+            elif detection < NEAR_AFTER_SF:
+                #new lap and zone just after S/F
+                crossings.append((index, id, curTime - (cur - detection) / (cur + (1-last)) * elapsedTime))
+            else:
+                #new lap and zone just before S/F
+                crossings.append((index, id, lastTime + (detection - last) / (cur + (1-last)) * elapsedTime))
+        return crossings
+
+    def _findNumpy(self, lastSplines, splines, count, lastTime, curTime):
+        last = numpy.asarray(lastSplines[:count], dtype=numpy.float64)
+        cur = numpy.asarray(splines[:count], dtype=numpy.float64)
+        det = self._det
+        splineDist = cur - last
+        newLap = (splineDist <= NEW_LAP)[:, None]
+        lastCol = last[:, None]
+        curCol = cur[:, None]
+        # cars x zones masks, one per branch of the python loop
+        hit = (curCol >= det) & (lastCol < det)
+        if newLap.any():
+            hit &= ~newLap
+            hit |= newLap & self._afterSF & (curCol >= det) & (lastCol - 1 < det)
+            hit |= newLap & self._beforeSF & (curCol + 1 >= det) & (lastCol < det)
+
+        if not hit.any():
+            return []
+        crossed = numpy.flatnonzero(hit.any(axis=1))
+        zones = hit[crossed].argmax(axis=1)
+
+        last = last[crossed]
+        cur = cur[crossed]
+        det = det[zones]
+        wrapped = splineDist[crossed] <= NEW_LAP
+        elapsedTime = curTime - lastTime
+        perSpline = elapsedTime / numpy.where(wrapped, cur + (1 - last), cur - last)
+        fromLast = lastTime + (det - last) * perSpline
+        fromCur = curTime - (cur - det) * perSpline
+        times = numpy.where(wrapped & (det < NEAR_AFTER_SF), fromCur, fromLast)
+        return list(zip(crossed.tolist(), zones.tolist(), times.tolist()))
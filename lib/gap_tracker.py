@@ -0,0 +1,183 @@
+# Time gaps between any two cars at any point on track.
+#
+# Each car has a fixed size ring buffer of (distance, time) samples in array
+# columns, distance being laps plus spline position, so it only grows while the
+# car drives. The laps of a car's first sample, and of its first one after its
+# position jumped back (back to pit), come from getLap (the game's completed
+# laps), -1 for a car lined up behind S/F; later S/F passes count on from
+# there. So distance is race distance, the same for all cars at the same point
+# of the same lap, also for a car that joined mid-race. Without getLap laps
+# start at 0 and distances only line up between cars reset together at the
+# race start. A sample is kept every MIN_STEP of a lap, so a stationary
+# car adds nothing and the buffer covers the last capacity * MIN_STEP laps
+# (two by default) whatever the update rate.
+#
+# timeAt() is a bisect over one car's samples and a linear interpolation
+# between the two around the distance. gap(a, b, s) takes the distance d where
+# a last passed spline position s and is timeAt(a, d) - timeAt(b, d), i.e. how
+# far b was ahead of a there. A car that has not reached d, a lapped car for
+# one, is not ahead. None when b was not ahead or either pass is no longer in
+# the buffers.
+
+from array import array
+
+MIN_STEP = 0.001    # lap fraction between samples, ~5 m on a 5 km track
+JUMP_BACK = 0.01    # a car moving back further than this was reset (back to pit)
+
+
+class GapTracker:
+    def __init__(self, count=0, capacity=2048, getLap=None):
+        self.capacity = capacity
+        self.getLap = getLap            # completed laps of a car, ac.getCarState LapCount in the game
+        self.count = 0
+        self.dist = []                  # per car ring of distance, laps + spline
+        self.times = []                 # per car ring of sample time
+        self.head = array('i')          # slot of the oldest sample
+        self.size = array('i')
+        self.laps = array('i')          # laps of the latest sample
+        self.lastSpline = array('d')
+        self.resize(count)
+
+    def resize(self, count):
+        if count > self.count:
+            extra = count - self.count
+            for _ in range(extra):
+                self.dist.append(array('d', [0.0]) * self.capacity)
+                self.times.append(array('d', [0.0]) * self.capacity)
+            self.head.extend(array('i', [0]) * extra)
+            self.size.extend(array('i', [0]) * extra)
+            self.laps.extend(array('i', [0]) * extra)
+            self.lastSpline.extend(array('d', [0.0]) * extra)
+        elif count < self.count:
+            for column in (self.dist, self.times, self.head, self.size, self.laps, self.lastSpline):
+                del column[count:]
+        self.count = count
+
+    def clear(self, car):
+        # laps are taken afresh at the next sample
+        self.head[car] = 0
+        self.size[car] = 0
+
+    def reset(self):
+        for car in range(self.count):
+            self.clear(car)
+
+    def _startLap(self, car, spline):
+        # laps of a car's first sample
+        if self.getLap is None:
+            return 0
+        laps = self.getLap(car)
+        if laps == 0 and spline > 0.5:
+            # on the grid, behind S/F
+            return -1
+        return laps
+
+    def _last(self, car):
+        return (self.head[car] + self.size[car] - 1) % self.capacity
+
+    def update(self, time, splines, connected):
+        # one sample per car that moved on by MIN_STEP since its last one
+        capacity = self.capacity
+        sizes = self.size
+        heads = self.head
+        laps = self.laps
+        lastSpline = self.lastSpline
+        for car in range(self.count):
+            size = sizes[car]
+            if not connected[car]:
+                if size:
+                    self.clear(car)
+                continue
+            spline = splines[car]
+            if size:
+                moved = spline - lastSpline[car]
+                if moved < -0.5:
+                    # over S/F
+                    laps[car] += 1
+                elif moved < -JUMP_BACK:
+                    self.clear(car)
+                    size = 0
+            if not size:
+                laps[car] = self._startLap(car, spline)
+            lastSpline[car] = spline
+            distance = laps[car] + spline
+            dist = self.dist[car]
+            head = heads[car]
+            if size:
+                if distance - dist[(head + size - 1) % capacity] < MIN_STEP:
+                    continue
+                if size == capacity:
+                    # full, drop the oldest
+                    head = heads[car] = (head + 1) % capacity
+                    size -= 1
+            slot = (head + size) % capacity
+            dist[slot] = distance
+            self.times[car][slot] = time
+            sizes[car] = size + 1
+
+    def distance(self, car):
+        # distance of the latest sample, None before the first
+        if not self.size[car]:
+            return None
+        return self.dist[car][self._last(car)]
+
+    def timeAt(self, car, distance):
+        # time car was at distance, None outside its samples
+        size = self.size[car]
+        if not size:
+            return None
+        dist = self.dist[car]
+        times = self.times[car]
+        head = self.head[car]
+        capacity = self.capacity
+        if distance < dist[head] or distance > dist[(head + size - 1) % capacity]:
+            return None
+        lo = 0
+        hi = size - 1
+        # last sample at or before distance
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if dist[(head + mid) % capacity] <= distance:
+                lo = mid
+            else:
+                hi = mid - 1
+        slot = (head + lo) % capacity
+        if lo == size - 1 or dist[slot] == distance:
+            return times[slot]
+        nxt = (slot + 1) % capacity
+        fraction = (distance - dist[slot]) / (dist[nxt] - dist[slot])
+        return times[slot] + fraction * (times[nxt] - times[slot])
+
+    def lastPass(self, car, spline):
+        # distance where car last passed spline position, None before its first sample
+        current = self.distance(car)
+        if current is None:
+            return None
+        return current - (current - spline) % 1.0
+
+    def gap(self, a, b, spline):
+        # seconds b was ahead of a when a last passed spline, None if b was not ahead or unknown
+        distance = self.lastPass(a, spline)
+        if distance is None:
+            return None
+        reached = self.distance(b)
+        if reached is None or reached < distance:
+            return None
+        passedA = self.timeAt(a, distance)
+        passedB = self.timeAt(b, distance)
+        if passedA is None or passedB is None or passedB > passedA:
+            return None
+        return passedA - passedB
+
+    def carAhead(self, car, spline):
+        # (car, gap) of the car closest ahead of car at spline, (-1, None) if none
+        best = -1
+        bestGap = None
+        for other in range(self.count):
+            if other == car:
+                continue
+            gap = self.gap(car, other, spline)
+            if gap is not None and (bestGap is None or gap < bestGap):
+                best = other
+                bestGap = gap
+        return best, bestGap
@@ -0,0 +1,119 @@
+# Log messages buffered and deduplicated between flushes.
+#
+# Messages go into a preallocated ring buffer instead of straight to ac.log.
+# A message whose signature (level, text and, for exceptions, the line that
+# raised) is already waiting is not stored again, its repeat counter goes up.
+# flush() writes every waiting message once, with " (xN)" when it came N
+# times, so a fault that repeats every update costs one line per flush instead
+# of one per update. A traceback is formatted only the first time its
+# signature is seen, later repeats log the message alone.
+#
+# Until the app has a timer to flush from, immediate is True and messages are
+# written as they come. When the buffer is full, new messages are dropped and
+# counted, the count is logged at the next flush.
+
+from array import array
+import sys
+import time
+import traceback
+
+DEBUG = 0
+INFO = 1
+WARNING = 2
+ERROR = 3
+
+MAX_TRACED = 256    # signatures remembered as having logged their traceback
+
+
+class LogBuffer:
+    def __init__(self, write, prefix, capacity=128, level=INFO):
+        self.write = write          # ac.log in the game
+        self.prefix = prefix
+        self.capacity = capacity
+        self.level = level
+        self.immediate = True
+        self.messages = [None] * capacity
+        self.details = [None] * capacity    # traceback text, first occurrence only
+        self.counts = array('I', [0]) * capacity
+        self.head = 0               # slot of the oldest waiting message
+        self.size = 0
+        self.waiting = {}           # signature -> slot
+        self.traced = set()
+        self.repeats = 0            # messages merged into a waiting one
+        self.dropped = 0            # messages lost to a full buffer, since the last flush
+        self.written = 0
+
+    def debug(self, msg):
+        self.add(DEBUG, msg)
+
+    def info(self, msg):
+        self.add(INFO, msg)
+
+    def warning(self, msg):
+        self.add(WARNING, msg)
+
+    def error(self, msg, exc=False):
+        # exc: called from an except block, add the traceback
+        self.add(ERROR, msg, exc)
+
+    def add(self, level, msg, exc=False):
+        if level < self.level:
+            return
+        where = None
+        if exc:
+            tb = sys.exc_info()[2]
+            while tb is not None and tb.tb_next is not None:
+                tb = tb.tb_next
+            if tb is not None:
+                where = (tb.tb_frame.f_code.co_filename, tb.tb_lineno)
+        signature = (level, msg, where)
+        if self.immediate:
+            self._write(msg, 1, self._detail(signature, exc))
+            return
+        slot = self.waiting.get(signature)
+        if slot is not None:
+            self.counts[slot] += 1
+            self.repeats += 1
+            return
+        if self.size == self.capacity:
+            self.dropped += 1
+            return
+        slot = (self.head + self.size) % self.capacity
+        self.messages[slot] = msg
+        self.details[slot] = self._detail(signature, exc)
+        self.counts[slot] = 1
+        self.waiting[signature] = slot
+        self.size += 1
+
+    def _detail(self, signature, exc):
+        if not exc or signature in self.traced:
+            return None
+        if len(self.traced) >= MAX_TRACED:
+            self.traced.clear()
+        self.traced.add(signature)
+        return 'Exception: %s\n%s' % (time.asctime(), traceback.format_exc())
+
+    def _write(self, msg, count, detail):
+        if count > 1:
+            msg = "%s (x%d)" % (msg, count)
+        self.write("%s: %s" % (self.prefix, msg))
+        if detail is not None:
+            self.write(detail)
+        self.written += 1
+
+    def flush(self):
+        # write every waiting message, oldest first
+        while self.size:
+            slot = self.head
+            self._write(self.messages[slot], self.counts[slot], self.details[slot])
+            self.messages[slot] = None
+            self.details[slot] = None
+            self.head = (self.head + 1) % self.capacity
+            self.size -= 1
+        self.waiting.clear()
+        if self.dropped:
+            self.write("%s: %d log messages dropped, buffer full" % (self.prefix, self.dropped))
+            self.dropped = 0
+
+    def __len__(self):
+        return self.size
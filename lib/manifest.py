@@ -0,0 +1,101 @@
+# Checksums of the app's files for the "app running" announcement.
+#
+# Manifest hashes every file the app runs with (code, rules, sounds, images and
+# libraries, see INCLUDE and EXCLUDE) on a background thread, reading in chunks
+# so the game keeps the CPU. Digests are cached in a JSON file keyed by path
+# with the file's size and mtime, so a later session only hashes files that
+# changed. digest() combines the per file digests (in path order) into one.
+#
+# The worker never calls ac. ready is set when it is done; error holds the
+# exception if it failed.
+
+from threading import Thread, Event
+import hashlib
+import json
+import os
+import time
+
+INCLUDE = ('.py', '.ini', '.wav', '.png', '.pyd', '.dll')
+EXCLUDE = ('preferences.ini', 'headless')   # per driver settings, dev tooling
+CHUNK = 64 * 1024
+
+
+def fileDigest(path):
+    hasher = hashlib.md5()
+    with open(path, 'rb') as f:
+        while True:
+            buf = f.read(CHUNK)
+            if not buf:
+                break
+            hasher.update(buf)
+            # let the game's threads run between chunks
+            time.sleep(0)
+    return hasher.hexdigest()
+
+
+class Manifest:
+    def __init__(self, root, cachePath):
+        self.root = root
+        self.cachePath = cachePath
+        self.files = {}         # relative path -> digest
+        self.hashed = 0         # files hashed this session (not from the cache)
+        self.error = None
+        self.ready = Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = Thread(target=self._worker)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def paths(self):
+        # relative paths of the files covered, '/' separated
+        found = []
+        for folder, dirs, names in os.walk(self.root):
+            rel = os.path.relpath(folder, self.root)
+            rel = '' if rel == '.' else rel.replace(os.sep, '/') + '/'
+            dirs[:] = sorted(name for name in dirs if rel + name not in EXCLUDE and not name.startswith('.'))
+            for name in names:
+                if name.endswith(INCLUDE) and rel + name not in EXCLUDE:
+                    found.append(rel + name)
+        return sorted(found)
+
+    def _loadCache(self):
+        try:
+            with open(self.cachePath, 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _worker(self):
+        try:
+            cache = self._loadCache()
+            fresh = {}
+            for rel in self.paths():
+                path = os.path.join(self.root, rel)
+                st = os.stat(path)
+                entry = cache.get(rel)
+                if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime:
+                    digest = entry[2]
+                else:
+                    digest = fileDigest(path)
+                    self.hashed += 1
+                fresh[rel] = [st.st_size, st.st_mtime, digest]
+                self.files[rel] = digest
+            if fresh != cache:
+                try:
+                    with open(self.cachePath, 'w') as f:
+                        json.dump(fresh, f)
+                except (IOError, OSError):
+                    # digests are still good, the next session hashes again
+                    pass
+        except Exception as e:
+            self.error = e
+        self.ready.set()
+
+    def digest(self):
+        # one digest over every file's path and digest
+        hasher = hashlib.md5()
+        for rel in sorted(self.files):
+            hasher.update(('%s:%s\n' % (rel, self.files[rel])).encode('utf-8'))
+        return hasher.hexdigest()
@@ -0,0 +1,131 @@
+# Penalty ledger with an append-only journal on disk.
+#
+# pending holds the drive through penalties still to be served, oldest first,
+# and timed the penalties handed out at race end. Every change is also a JSON
+# line for the journal: add, serve, clear and unserved. Lines are buffered and
+# written together by flush(), which the app calls about once a second and on
+# shutdown, so the update itself never touches the disk.
+#
+# The journal starts with a session line holding a key (server, track, car,
+# driver). When the app starts again with the same key the journal is replayed
+# to restore the penalties, so a game crash or an app reload mid-race loses at
+# most the last unflushed second. A different key starts a new journal. A
+# partly written last line (crash mid-write) is ignored.
+#
+# The key does not tell one race on a server from the next, so the app clears
+# the ledger when it sees a new race grid or a session other than a race.
+
+from collections import deque
+import json
+import os
+
+
+class PenaltyJournal:
+    def __init__(self, path, key):
+        self.path = path
+        self.key = list(key)
+        self.pending = deque()
+        self.timed = deque()
+        self.restored = 0
+        self._buffer = []
+        self._file = None
+        if path is None:
+            return
+        if self._replay():
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+            self._write({"op": "session", "key": self.key})
+            self.flush()
+
+    def _replay(self):
+        # True if the journal on disk belongs to this session and was applied
+        try:
+            with open(self.path, 'rb') as f:
+                lines = f.readlines()
+        except (IOError, OSError):
+            return False
+        try:
+            header = json.loads(lines[0].decode('utf-8'))
+        except (IndexError, ValueError):
+            return False
+        if header.get("op") != "session" or header.get("key") != self.key:
+            return False
+        valid = len(lines[0])
+        for line in lines[1:]:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except ValueError:
+                break
+            self._apply(record)
+            valid += len(line)
+        if valid < sum(len(line) for line in lines):
+            # drop the torn tail so new lines don't join it
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid)
+        self.restored = len(self.pending) + len(self.timed)
+        return True
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "add":
+            (self.timed if record.get("timed") else self.pending).append(record["pen"])
+        elif op == "serve":
+            if self.pending:
+                self.pending.popleft()
+        elif op == "clear":
+            (self.timed if record.get("timed") else self.pending).clear()
+        elif op == "unserved":
+            for pen in self.pending:
+                pen["detail"] = "UNSERVED %s (POST RACE)" % pen["detail"]
+
+    def _write(self, record):
+        if self.path is not None:
+            self._buffer.append(json.dumps(record) + '\n')
+
+    def _do(self, record):
+        self._apply(record)
+        self._write(record)
+
+    def add(self, pen):
+        # drive through penalty to be served
+        self._do({"op": "add", "pen": pen})
+
+    def addTimed(self, pen):
+        # penalty handed out at race end
+        self._do({"op": "add", "timed": 1, "pen": pen})
+
+    def serve(self):
+        # oldest pending penalty served, returns it
+        pen = self.pending[0]
+        self._do({"op": "serve"})
+        return pen
+
+    def clearPending(self):
+        self._do({"op": "clear"})
+
+    def clearTimed(self):
+        self._do({"op": "clear", "timed": 1})
+
+    def markUnserved(self):
+        # race over, pending penalties become post race ones
+        self._do({"op": "unserved"})
+        return list(self.pending)
+
+    def flush(self):
+        # write the buffered changes as one group commit
+        if not self._buffer or self._file is None:
+            return
+        self._file.write(''.join(self._buffer).encode('utf-8'))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer = []
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
@@ -0,0 +1,101 @@
+# Update time per code region, as fixed bucket histograms.
+#
+# Regions are timed by chaining laps off one clock reading:
+#
+#   t = timer.now()
+#   ...                             # region a
+#   t = timer.lap(REGION_A, t)
+#   ...                             # region b
+#   t = timer.lap(REGION_B, t)
+#
+# lap() adds the elapsed time to the region's histogram: BUCKETS_PER_OCTAVE
+# buckets per doubling from 1 us up to about 1 s, found by a bisect over the
+# bucket edges, plus an exact maximum. Percentiles are read off the buckets so
+# they are within one bucket width (~19%) of the true value.
+#
+# dump() appends count, p50, p99 and max of every region to a CSV file, returns
+# a one line summary and starts the next period from empty histograms.
+# perf_counter_ns is used where the python has it (3.7 on), perf_counter
+# otherwise.
+
+from array import array
+from bisect import bisect_right
+import time
+
+BUCKETS_PER_OCTAVE = 4
+OCTAVES = 20                        # 1 us * 2^20 ~ 1 s
+
+if hasattr(time, 'perf_counter_ns'):
+    _clock = time.perf_counter_ns
+    _NS = 1
+else:
+    _clock = time.perf_counter
+    _NS = 1e-9
+# bucket upper edges in clock units, the last bucket takes everything above
+EDGES = array('d', [1000 * 2 ** (i / float(BUCKETS_PER_OCTAVE)) * _NS
+                    for i in range(BUCKETS_PER_OCTAVE * OCTAVES + 1)])
+
+
+class RegionTimer:
+    def __init__(self, names, path=None):
+        self.names = list(names)
+        self.path = path
+        self.counts = [array('I', [0]) * (len(EDGES) + 1) for _ in self.names]
+        self.total = array('I', [0]) * len(self.names)
+        self.max = array('d', [0.0]) * len(self.names)
+        self.periodStart = time.time()
+        self.now = _clock
+
+    def lap(self, region, start):
+        # record the time since start against region, returns now for the next region
+        now = _clock()
+        elapsed = now - start
+        self.counts[region][bisect_right(EDGES, elapsed)] += 1
+        self.total[region] += 1
+        if elapsed > self.max[region]:
+            self.max[region] = elapsed
+        return now
+
+    def percentile(self, region, fraction):
+        # upper edge of the bucket holding the fraction'th sample, in microseconds
+        total = self.total[region]
+        if total == 0:
+            return 0.0
+        target = fraction * total
+        seen = 0
+        for bucket, count in enumerate(self.counts[region]):
+            seen += count
+            if seen >= target:
+                if bucket >= len(EDGES):
+                    return self.max[region] / _NS / 1000.0
+                return min(EDGES[bucket], self.max[region]) / _NS / 1000.0
+        return self.max[region] / _NS / 1000.0
+
+    def rows(self):
+        # (name, count, p50 us, p99 us, max us) of the regions timed this period
+        return [(name, self.total[region], self.percentile(region, 0.5), self.percentile(region, 0.99),
+                 self.max[region] / _NS / 1000.0)
+                for region, name in enumerate(self.names) if self.total[region]]
+
+    def reset(self):
+        for region in range(len(self.names)):
+            counts = self.counts[region]
+            for bucket in range(len(counts)):
+                counts[bucket] = 0
+            self.total[region] = 0
+            self.max[region] = 0.0
+        self.periodStart = time.time()
+
+    def dump(self):
+        # write this period's rows, returns the summary line ("" if nothing was timed)
+        rows = self.rows()
+        if rows and self.path is not None:
+            with open(self.path, 'a') as f:
+                if f.tell() == 0:
+                    f.write("time,region,count,p50_us,p99_us,max_us\n")
+                for name, count, p50, p99, peak in rows:
+                    f.write("%.0f,%s,%d,%.1f,%.1f,%.1f\n" % (self.periodStart, name, count, p50, p99, peak))
+        summary = "; ".join("%s p50 %.0f p99 %.0f max %.0f us" % (name, p50, p99, peak)
+                            for name, count, p50, p99, peak in rows)
+        self.reset()
+        return summary
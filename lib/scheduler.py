@@ -0,0 +1,68 @@
+# Delayed callbacks run from acUpdate.
+#
+# The scheduler has its own clock, the sum of the deltaT values acUpdate passes
+# to advance(). Callbacks are kept in a heap by due time and run from advance()
+# on the game's update thread, in due order (ties in the order they were
+# armed). Nothing here starts a thread, and a replayed session fires every
+# callback on the same frame as the original.
+#
+# after() returns a Timer that can be cancelled or re-armed. Re-arming pushes a
+# new heap entry; the old one is skipped when it comes up.
+
+import heapq
+
+
+class Timer:
+    __slots__ = ('scheduler', 'callback', 'args', 'due', 'seq')
+
+    def __init__(self, scheduler, callback, args):
+        self.scheduler = scheduler
+        self.callback = callback
+        self.args = args
+        self.due = None
+        self.seq = 0
+
+    @property
+    def active(self):
+        return self.due is not None
+
+    def cancel(self):
+        self.due = None
+
+    def rearm(self, delay):
+        # (re)start the timer delay seconds from now, also from its own callback
+        self.scheduler._arm(self, delay)
+
+
+class Scheduler:
+    def __init__(self):
+        self.time = 0.0
+        self._heap = []
+        self._seq = 0
+
+    def after(self, delay, callback, *args):
+        timer = Timer(self, callback, args)
+        self._arm(timer, delay)
+        return timer
+
+    def _arm(self, timer, delay):
+        self._seq += 1
+        timer.due = self.time + delay
+        timer.seq = self._seq
+        heapq.heappush(self._heap, (timer.due, timer.seq, timer))
+
+    def advance(self, deltaT):
+        # move the clock on and run everything that is due
+        self.time += deltaT
+        heap = self._heap
+        while heap and heap[0][0] <= self.time:
+            due, seq, timer = heapq.heappop(heap)
+            if timer.seq != seq or timer.due is None:
+                # cancelled or re-armed since this entry was pushed
+                continue
+            timer.due = None
+            timer.callback(*timer.args)
+
+    def __len__(self):
+        # armed timers
+        return sum(1 for due, seq, timer in self._heap if timer.seq == seq and timer.due is not None)
@@ -0,0 +1,38 @@
+# Session clock taken from the simulator instead of the wall clock.
+#
+# graphics.iCurrentTime is the player's current lap time in ms. The clock adds
+# up how far it moved between updates, carrying over lap ends with iLastTime,
+# so it stops while the game is paused and runs at the simulation's pace.
+# Nothing moves on updates that see the same graphics packetId (no new frame).
+# When the lap time can't be followed (session restart, back to pits, a lap end
+# without iLastTime) the update's own deltaT is used instead.
+#
+# The lap timer only has ms resolution. When it agrees with deltaT to within a
+# ms, deltaT is taken as the finer measure of the same interval.
+
+class SimClock:
+    def __init__(self):
+        self.time = 0.0         # seconds
+        self.packetId = None
+        self.laps = 0
+        self.lapTime = 0        # ms
+
+    def update(self, graphics, deltaT):
+        # advance to the given graphics page, deltaT is the wall time since the last update
+        if graphics.packetId == self.packetId:
+            return self.time
+        lapTime = graphics.iCurrentTime
+        laps = graphics.completedLaps
+        step = -1.0
+        if self.packetId is not None:
+            if laps == self.laps:
+                step = (lapTime - self.lapTime) / 1000.0
+            elif laps == self.laps + 1 and graphics.iLastTime > 0:
+                step = (graphics.iLastTime - self.lapTime + lapTime) / 1000.0
+        if step < 0.0 or step > deltaT + 0.1 or abs(step - deltaT) <= 0.001:
+            step = deltaT
+        self.time += step
+        self.packetId = graphics.packetId
+        self.laps = laps
+        self.lapTime = lapTime
+        return self.time
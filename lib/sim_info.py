@@ -3,6 +3,8 @@
 import mmap
 import functools
 import ctypes
+import os
+import sys
 from ctypes import c_int32, c_float, c_wchar
 
 AC_STATUS = c_int32
@@ -175,19 +177,180 @@ class SPageFileStatic(ctypes.Structure):
         ('pitWindowEnd', c_int32)
         ]
 
+# AC publishes these as [4][3] (wheel, xyz); the ctypes declarations above nest
+# the other way round, the memory is the same 12 floats
+ARRAY_SHAPES = {
+    'tyreContactPoint': (4, 3),
+    'tyreContactNormal': (4, 3),
+    'tyreContactHeading': (4, 3),
+    }
+
+class PageArrays:
+    # Read only NumPy views over every numeric array field of a page (wheelSlip,
+    # tyreWear, brakeTemp, carDamage, ...), built once over the page's buffer.
+    # Reading them copies nothing and always shows the buffer's current values.
+    def __init__(self, page, buffer):
+        import numpy
+        dtypes = {c_float: numpy.float32, c_int32: numpy.int32}
+        for name, fieldType in page._fields_:
+            element = fieldType
+            while issubclass(element, ctypes.Array):
+                element = element._type_
+            if element is fieldType or element not in dtypes:
+                # scalars and strings
+                continue
+            field = getattr(page, name)
+            count = field.size // ctypes.sizeof(element)
+            view = numpy.frombuffer(buffer, dtype=dtypes[element], count=count, offset=field.offset)
+            view = view.reshape(ARRAY_SHAPES.get(name, (count,)))
+            view.flags.writeable = False
+            setattr(self, name, view)
+
+def _address(buffer):
+    return ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer))
+
+class SimSnapshot:
+    # Consistent copy of the three pages taken by SimInfo.snapshot(). The pages
+    # are reused, so a snapshot is only valid until the next snapshot() call.
+    # Its physics/graphics/static attributes can't be rebound, the pages
+    # themselves are plain ctypes structures over the copy: writing to them
+    # changes only the copy, until the next snapshot() overwrites it.
+    __slots__ = ('physics', 'graphics', 'static', 'torn', '_physicsBuffer', '_physicsArrays')
+
+    def __init__(self, physics, graphics, static, physicsBuffer):
+        object.__setattr__(self, 'physics', physics)
+        object.__setattr__(self, 'graphics', graphics)
+        object.__setattr__(self, 'static', static)
+        object.__setattr__(self, 'torn', False)
+        object.__setattr__(self, '_physicsBuffer', physicsBuffer)
+        object.__setattr__(self, '_physicsArrays', None)
+
+    @property
+    def physicsArrays(self):
+        # NumPy views over the array fields of the snapshot's physics page
+        if self._physicsArrays is None:
+            object.__setattr__(self, '_physicsArrays', PageArrays(SPageFilePhysics, self._physicsBuffer))
+        return self._physicsArrays
+
+    def __setattr__(self, name, value):
+        raise AttributeError("snapshots are read only")
+
+def _copyPage(live, src, copy, dst, scratch, scratchDst, size, retries):
+    # memmove the live page into copy twice (the second time into scratch) and
+    # accept it when both copies match and packetId did not move. packetId alone
+    # can't tell: the game bumps it at the start or end of a write, so a copy
+    # that races the rest of the write still sees it unchanged. Returns False
+    # if never clean.
+    for _ in range(retries):
+        before = live.packetId
+        ctypes.memmove(dst, src, size)
+        ctypes.memmove(scratchDst, src, size)
+        if copy == scratch and live.packetId == before:
+            return True
+    return False
+
+# Backends provide the memory the pages live in. open(name, size) returns a
+# writable buffer of at least size bytes for the page called name.
+
+class NamedMappingBackend:
+    # the shared memory Assetto Corsa publishes (Windows only)
+    def open(self, name, size):
+        return mmap.mmap(0, size, name)
+
+class FileBackend:
+    # pages memory mapped from files in folder, e.g. /dev/shm/acpmf on Linux,
+    # so another process (see headless/page_producer.py) can write them
+    def __init__(self, folder, create=True):
+        self.folder = folder
+        self.create = create
+
+    def open(self, name, size):
+        path = os.path.join(self.folder, name)
+        if self.create:
+            if not os.path.isdir(self.folder):
+                os.makedirs(self.folder)
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+        with open(path, 'r+b') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < size:
+                f.truncate(size)
+            return mmap.mmap(f.fileno(), size)
+
+class MemoryBackend:
+    # plain process memory, for tests and the headless harness
+    def open(self, name, size):
+        return bytearray(size)
+
+def defaultBackend():
+    # ACPMF_DIR points at a folder of page files, otherwise the game's mapping
+    # on Windows and process memory anywhere else
+    folder = os.environ.get('ACPMF_DIR')
+    if folder:
+        return FileBackend(folder)
+    if sys.platform == 'win32':
+        return NamedMappingBackend()
+    return MemoryBackend()
+
 class SimInfo:
-    def __init__(self):
-        self._acpmf_physics = mmap.mmap(0, ctypes.sizeof(SPageFilePhysics), "acpmf_physics")
-        self._acpmf_graphics = mmap.mmap(0, ctypes.sizeof(SPageFileGraphic), "acpmf_graphics")
-        self._acpmf_static = mmap.mmap(0, ctypes.sizeof(SPageFileStatic), "acpmf_static")
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = defaultBackend()
+        self.backend = backend
+        self._acpmf_physics = backend.open("acpmf_physics", ctypes.sizeof(SPageFilePhysics))
+        self._acpmf_graphics = backend.open("acpmf_graphics", ctypes.sizeof(SPageFileGraphic))
+        self._acpmf_static = backend.open("acpmf_static", ctypes.sizeof(SPageFileStatic))
         self.physics = SPageFilePhysics.from_buffer(self._acpmf_physics)
         self.graphics = SPageFileGraphic.from_buffer(self._acpmf_graphics)
         self.static = SPageFileStatic.from_buffer(self._acpmf_static)
+        # snapshot pages live in local bytearrays so two copies compare cheaply
+        self._copyBuffers = [bytearray(ctypes.sizeof(page)) for page in (SPageFilePhysics, SPageFileGraphic, SPageFileStatic)]
+        self._scratch = bytearray(max(len(buffer) for buffer in self._copyBuffers))
+        self._snapshot = SimSnapshot(*[page.from_buffer(buffer) for page, buffer in
+            zip((SPageFilePhysics, SPageFileGraphic, SPageFileStatic), self._copyBuffers)] + [self._copyBuffers[0]])
+        self._physicsArrays = None
+        self._copies = []
+        for live, buffer in zip((self.physics, self.graphics), self._copyBuffers):
+            size = len(buffer)
+            scratch = memoryview(self._scratch)[:size]
+            self._copies.append((live, ctypes.addressof(live), buffer, _address(buffer), scratch, _address(scratch), size))
+        self._staticCopy = (_address(self._copyBuffers[2]), ctypes.addressof(self.static), ctypes.sizeof(self.static))
+
+    @property
+    def physicsArrays(self):
+        # NumPy views straight over the live physics page (needs numpy)
+        if self._physicsArrays is None:
+            self._physicsArrays = PageArrays(SPageFilePhysics, self._acpmf_physics)
+        return self._physicsArrays
+
+    def snapshot(self, retries=4):
+        # Copy all pages into local buffers, so everything read for an update
+        # comes from the same game frame, not a mix of frames the game wrote
+        # while the update was reading. torn is set when a page never copied
+        # clean within retries.
+        clean = True
+        for page in self._copies:
+            if not _copyPage(*(page + (retries,))):
+                clean = False
+        # static has no packetId, it only changes when a session loads
+        ctypes.memmove(*self._staticCopy)
+        snap = self._snapshot
+        object.__setattr__(snap, 'torn', not clean)
+        return snap
 
     def close(self):
-        self._acpmf_physics.close()
-        self._acpmf_graphics.close()
-        self._acpmf_static.close()
+        # the page views hold the buffers open, drop them before closing
+        self.physics = self.graphics = self.static = None
+        self._copies = None
+        self._physicsArrays = None
+        for name in ('_acpmf_physics', '_acpmf_graphics', '_acpmf_static'):
+            buffer = getattr(self, name, None)
+            if hasattr(buffer, 'close'):
+                try:
+                    buffer.close()
+                except BufferError:
+                    # a view is still referenced elsewhere, the map goes with it
+                    pass
 
     def __del__(self):
         self.close()
@@ -197,9 +360,15 @@ info = SimInfo()
 def demo():
     import time
 
+    try:
+        tyreWear = info.physicsArrays.tyreWear
+    except ImportError:
+        tyreWear = None
+
     for _ in range(400):
         print(info.static.track, info.graphics.tyreCompound, info.graphics.currentTime,
-              info.physics.rpms, info.graphics.currentTime, info.static.maxRpm, list(info.physics.tyreWear))
+              info.physics.rpms, info.graphics.currentTime, info.static.maxRpm,
+              tyreWear if tyreWear is not None else list(info.physics.tyreWear))
         time.sleep(0.1)
 
 def do_test():
@@ -0,0 +1,175 @@
+# Steward mode: the app's race rules applied to every other car on the grid.
+#
+# driverInfo judges the player from the physics and graphics pages. Steward
+# judges cars 1 and up from what ac reports for any car, keeping each car's
+# rule state in array columns like DriverStore:
+#   - DRS: a car that crosses a detection line is eligible if another car
+#     crossed it within the DRS gap before (from the shared CrossingLog). A car
+#     using DRS in a zone it is not eligible for, or opening DRS outside a
+#     zone, gets a penalty. DRS use is only seen when a getDrs reader is given.
+#   - pit lane: a penalty is served by driving through the pit lane without
+#     stopping, as for the player.
+#   - start tyre: cars in the quali top X must start on their best quali lap
+#     tyre.
+# Each pass goes over the grid once, and only cars in a zone or with a penalty
+# pending need more than that. Refuelling is not checked, other cars' fuel is
+# not reported.
+#
+# The ac reads are passed in as callables taking a car index, so the caller
+# decides what a read costs. Penalties are dicts like the player's with the car
+# index added, new ones are returned from each pass for the caller to log.
+# summary() gives each car's post race penalty count for one announcement at
+# race end, a message per penalty would be far over the chat budget.
+
+from array import array
+from collections import deque
+
+FIRST_CAR = 1   # car 0 is the player, judged by driverInfo
+
+
+class Steward:
+    def __init__(self, count, rules, getDriver, getLap):
+        self.rules = rules
+        self.getDriver = getDriver
+        self.getLap = getLap            # completed laps of a car
+        self.count = 0
+        self.inZone = array('b')        # between detection and end line of lastDRS
+        self.drsValid = array('b')      # DRS allowed in that zone
+        self.penAwarded = array('b')    # illegal use already penalised in that zone
+        self.lastDrs = array('b')       # DRS open at the previous pass
+        self.serving = array('b')       # driving through the pit lane with a penalty
+        self.void = array('b')          # stopped in the pit lane, penalty not served
+        self.bestQLap = array('i')
+        self.qualiTyre = []
+        self.pending = []               # per car deque of penalties to serve
+        self.timePenalties = []         # post race penalties of every car
+        self.awarded = 0
+        self.resize(count)
+
+    def resize(self, count):
+        if count > self.count:
+            extra = count - self.count
+            for column in (self.inZone, self.drsValid, self.penAwarded, self.lastDrs, self.serving, self.void):
+                column.extend(array('b', [0]) * extra)
+            self.bestQLap.extend(array('i', [0]) * extra)
+            self.qualiTyre.extend([""] * extra)
+            self.pending.extend(deque() for _ in range(extra))
+        elif count < self.count:
+            for column in (self.inZone, self.drsValid, self.penAwarded, self.lastDrs, self.serving,
+                           self.void, self.bestQLap, self.qualiTyre, self.pending):
+                del column[count:]
+        self.count = count
+
+    def raceStart(self, getPosition, getTyre):
+        # new race: clear penalties and zone state, check start tyres
+        for car in range(self.count):
+            self.inZone[car] = self.drsValid[car] = self.penAwarded[car] = 0
+            self.lastDrs[car] = self.serving[car] = self.void[car] = 0
+            self.pending[car].clear()
+        self.timePenalties = []
+        new = []
+        rules = self.rules
+        if rules.startQTyre == 1:
+            for car in range(FIRST_CAR, self.count):
+                if self.qualiTyre[car] != "" and rules.topXtyreInQ >= getPosition(car) and getTyre(car) != self.qualiTyre[car]:
+                    pen = self._penalty(car, 0, "Incorrect starting tyre. (POST RACE)")
+                    self.timePenalties.append(pen)
+                    new.append(pen)
+        return new
+
+    def qualiUpdate(self, getBestLap, getTyre):
+        # tyre of each car's best quali lap
+        for car in range(FIRST_CAR, self.count):
+            best = getBestLap(car)
+            if best == 0:
+                self.bestQLap[car] = 0
+                self.qualiTyre[car] = ""
+            elif best < self.bestQLap[car] or self.bestQLap[car] == 0:
+                self.bestQLap[car] = best
+                self.qualiTyre[car] = getTyre(car)
+
+    def _penalty(self, car, lap, detail):
+        self.awarded += 1
+        return {"car": car, "lap": lap, "driver": self.getDriver(car), "detail": detail}
+
+    def drsUpdate(self, crossings, drivers, index, crossingLog, getDrs=None):
+        # crossings as returned by CrossingDetector.find for this update
+        new = []
+        rules = self.rules
+        if rules.drsGap <= 0.0:
+            return new
+        crossed = set()
+        for car, zone, crossTime in crossings:
+            if car < FIRST_CAR or car >= self.count:
+                continue
+            crossed.add(car)
+            self.inZone[car] = 1
+            self.penAwarded[car] = 0
+            self.drsValid[car] = 0
+            if self.getLap(car) + 1 >= rules.drsEnabledLap:
+                if crossingLog.carAhead(zone, car, drivers.DRStime[car], rules.drsGap) != -1:
+                    self.drsValid[car] = 1
+
+        inZone = self.inZone
+        for car in range(FIRST_CAR, self.count):
+            drs = 0
+            if getDrs is not None:
+                drs = 1 if getDrs(car) else 0
+            if car in crossed:
+                pass
+            elif inZone[car]:
+                if drs and not self.drsValid[car] and not self.penAwarded[car]:
+                    self.penAwarded[car] = 1
+                    pen = self._penalty(car, self.getLap(car) + 1, "Illegal DRS use, Zone %d" % (drivers.lastDRS[car] + 1))
+                    self.pending[car].append(pen)
+                    new.append(pen)
+                if drivers.lastDRS[car] < 0 or not index.inZone(drivers.lastDRS[car], drivers.spline[car]):
+                    inZone[car] = 0
+                    self.drsValid[car] = 0
+                    self.penAwarded[car] = 0
+            elif drs and not self.lastDrs[car]:
+                pen = self._penalty(car, self.getLap(car) + 1,
+                                    "Illegal DRS use, DRS opened without crossing detection line (Start or backToPit)")
+                self.pending[car].append(pen)
+                new.append(pen)
+            self.lastDrs[car] = drs
+        return new
+
+    def pitUpdate(self, inPitLane, getSpeed):
+        # drive through serving, returns the penalties served
+        served = []
+        for car in range(FIRST_CAR, self.count):
+            if not self.pending[car] and not self.serving[car]:
+                continue
+            if inPitLane(car):
+                if self.pending[car] and not self.void[car]:
+                    if getSpeed(car) > 5:
+                        self.serving[car] = 1
+                    else:
+                        self.void[car] = 1
+            else:
+                if self.serving[car] and not self.void[car] and self.pending[car]:
+                    served.append(self.pending[car].popleft())
+                self.serving[car] = 0
+                self.void[car] = 0
+        return served
+
+    def summary(self):
+        # (driver, post race penalties) of every car that has any, in car order
+        counts = {}
+        drivers = {}
+        for pen in self.timePenalties:
+            counts[pen["car"]] = counts.get(pen["car"], 0) + 1
+            drivers[pen["car"]] = pen["driver"]
+        return [(drivers[car], counts[car]) for car in sorted(counts)]
+
+    def raceEnd(self):
+        # pending penalties become post race ones, returns them
+        unserved = []
+        for car in range(FIRST_CAR, self.count):
+            while self.pending[car]:
+                pen = self.pending[car].popleft()
+                pen["detail"] = "UNSERVED %s (POST RACE)" % pen["detail"]
+                self.timePenalties.append(pen)
+                unserved.append(pen)
+        return unserved
@@ -0,0 +1,189 @@
+# Binary telemetry recorder and reader.
+#
+# A recording is one file: a fixed size header followed by fixed size records,
+# one per processed update. The header holds a magic, the record count, the car
+# count and a JSON blob with the session details (track, zones, track length,
+# record layout). Each record holds the PHYSICS_FIELDS and GRAPHICS_FIELDS of
+# the player's SimInfo pages, a few values read through `ac` and every car's
+# normalized spline position.
+#
+# The recorder preallocates the file in chunks and writes records straight into
+# a memory map, so a record costs one struct pack and one slice copy. The record
+# count in the header and the OS flush are only updated every flushEvery
+# records. A crash loses at most that many records.
+#
+# TelemetryReader iterates records as dicts (pure python, used for replays) or
+# returns them all as NumPy structured arrays via arrays().
+
+import json
+import mmap
+import struct
+
+MAGIC = b'AFDRSTEL'
+VERSION = 1
+HEADER_SIZE = 4096
+HEADER = struct.Struct('<8sIIII')   # magic, version, record count, car count, meta length
+
+# (name, struct code) of the values recorded from each page
+PHYSICS_FIELDS = [
+    ('packetId', 'i'),
+    ('gas', 'f'),
+    ('brake', 'f'),
+    ('fuel', 'f'),
+    ('speedKmh', 'f'),
+    ('drs', 'f'),
+    ('drsAvailable', 'i'),
+    ('drsEnabled', 'i'),
+    ]
+GRAPHICS_FIELDS = [
+    ('packetId', 'i'),
+    ('status', 'i'),
+    ('session', 'i'),
+    ('completedLaps', 'i'),
+    ('position', 'i'),
+    ('iCurrentTime', 'i'),
+    ('iLastTime', 'i'),
+    ('numberOfLaps', 'i'),
+    ('isInPit', 'i'),
+    ('isInPitLane', 'i'),
+    ('normalizedCarPosition', 'f'),
+    ]
+# values the app reads through ac for the player
+EXTRA_FIELDS = [
+    ('time', 'd'),
+    ('bestLap', 'i'),
+    ('tyre', '8s'),
+    ]
+
+_NUMPY_TYPES = {'i': '<i4', 'f': '<f4', 'd': '<f8', '8s': 'S8'}
+
+
+def recordLayout():
+    # (column name, struct code) in record order, spline column excluded
+    layout = [(name, code) for name, code in EXTRA_FIELDS]
+    layout += [('physics.' + name, code) for name, code in PHYSICS_FIELDS]
+    layout += [('graphics.' + name, code) for name, code in GRAPHICS_FIELDS]
+    return layout
+
+
+class TelemetryRecorder:
+    def __init__(self, path, carCount, meta=None, chunkRecords=9000, flushEvery=150):
+        self.path = path
+        self.carCount = carCount
+        self.flushEvery = flushEvery
+        self.layout = recordLayout()
+        self.fixed = struct.Struct('<' + ''.join(code for name, code in self.layout))
+        self.splineSize = 8 * carCount
+        self.recordSize = self.fixed.size + self.splineSize
+        self.chunkSize = chunkRecords * self.recordSize
+        self.count = 0
+        self.unflushed = 0
+
+        meta = dict(meta or {})
+        meta["layout"] = self.layout
+        meta["cars"] = carCount
+        meta["recordSize"] = self.recordSize
+        self.meta = json.dumps(meta).encode('utf-8')
+        if HEADER.size + len(self.meta) > HEADER_SIZE:
+            raise ValueError("telemetry header too large")
+
+        self._file = open(path, 'w+b')
+        self._file.truncate(HEADER_SIZE + self.chunkSize)
+        self._map = mmap.mmap(self._file.fileno(), HEADER_SIZE + self.chunkSize)
+        self._writeHeader()
+
+    def _writeHeader(self):
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.count, self.carCount, len(self.meta))
+        self._map[HEADER.size:HEADER.size + len(self.meta)] = self.meta
+
+    def _grow(self):
+        # out of preallocated space, extend the file by another chunk
+        size = len(self._map) + self.chunkSize
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def record(self, time, physics, graphics, bestLap, tyre, splines):
+        # splines must be a buffer of carCount doubles (a DriverStore column)
+        offset = HEADER_SIZE + self.count * self.recordSize
+        if offset + self.recordSize > len(self._map):
+            self._grow()
+        # argument order follows recordLayout()
+        self.fixed.pack_into(self._map, offset,
+            time, bestLap, tyre.encode('ascii', 'replace')[:8],
+            physics.packetId, physics.gas, physics.brake, physics.fuel,
+            physics.speedKmh, physics.drs, physics.drsAvailable, physics.drsEnabled,
+            graphics.packetId, graphics.status, graphics.session, graphics.completedLaps,
+            graphics.position, graphics.iCurrentTime, graphics.iLastTime, graphics.numberOfLaps,
+            graphics.isInPit, graphics.isInPitLane, graphics.normalizedCarPosition)
+        offset += self.fixed.size
+        data = memoryview(splines).cast('B')[:self.splineSize]
+        self._map[offset:offset + len(data)] = data
+        if len(data) < self.splineSize:
+            # cars left since recording started
+            self._map[offset + len(data):offset + self.splineSize] = bytes(self.splineSize - len(data))
+        self.count += 1
+        self.unflushed += 1
+        if self.unflushed >= self.flushEvery:
+            self.flush()
+
+    def flush(self):
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.count, self.carCount, len(self.meta))
+        self._map.flush()
+        self.unflushed = 0
+
+    def close(self):
+        if self._map is None:
+            return
+        self.flush()
+        self._map.close()
+        # drop the unused preallocated tail
+        self._file.truncate(HEADER_SIZE + self.count * self.recordSize)
+        self._file.close()
+        self._map = None
+
+
+class TelemetryReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        magic, version, self.count, self.carCount, metaLength = HEADER.unpack_from(header, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a telemetry recording" % path)
+        self.meta = json.loads(header[HEADER.size:HEADER.size + metaLength].decode('utf-8'))
+        self.layout = [(name, code) for name, code in self.meta["layout"]]
+        self.fixed = struct.Struct('<' + ''.join(code for name, code in self.layout))
+        self.recordSize = self.meta["recordSize"]
+        self.splines = struct.Struct('<%dd' % self.carCount)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # records as dicts, read sequentially so long sessions are never held in memory
+        names = [name for name, code in self.layout]
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER_SIZE)
+            for _ in range(self.count):
+                data = f.read(self.recordSize)
+                if len(data) < self.recordSize:
+                    break
+                record = dict(zip(names, self.fixed.unpack_from(data, 0)))
+                record["tyre"] = record["tyre"].rstrip(b'\0').decode('ascii', 'replace')
+                record["splines"] = self.splines.unpack_from(data, self.fixed.size)
+                yield record
+
+    def dtype(self):
+        import numpy
+        fields = [(name, _NUMPY_TYPES[code]) for name, code in self.layout]
+        fields.append(('splines', '<f8', (self.carCount,)))
+        return numpy.dtype(fields)
+
+    def arrays(self):
+        # all records as one NumPy structured array (memory mapped, read only)
+        import numpy
+        if self.count == 0:
+            return numpy.zeros(0, dtype=self.dtype())
+        return numpy.memmap(self.path, dtype=self.dtype(), mode='r', offset=HEADER_SIZE, shape=(self.count,))
@@ -0,0 +1,42 @@
+# Retained widget state in front of the ac widget setters.
+#
+# RetainedUi has the same setters as ac for the values the app changes while
+# running (visibility, text, background texture and opacity). It remembers the
+# last value sent for each widget and only calls ac when the value changes.
+# calls and saved count the setter calls passed on to ac and those skipped.
+#
+# Only use it for widgets nothing else changes: the game itself resets the app
+# window's opacity, so renderCallback keeps calling ac directly for that.
+# Create it together with the widgets it sets (driverInfo does, on every
+# acMain), so its state never outlives them.
+
+_UNSET = object()
+
+
+class RetainedUi:
+    def __init__(self, ac):
+        self.ac = ac
+        self.state = {}     # (setter, widget) -> last value sent
+        self.calls = 0
+        self.saved = 0
+
+    def _set(self, setter, widget, value):
+        key = (setter, widget)
+        if self.state.get(key, _UNSET) == value:
+            self.saved += 1
+            return
+        self.state[key] = value
+        self.calls += 1
+        getattr(self.ac, setter)(widget, value)
+
+    def setVisible(self, widget, value):
+        self._set('setVisible', widget, value)
+
+    def setText(self, widget, value):
+        self._set('setText', widget, value)
+
+    def setBackgroundTexture(self, widget, value):
+        self._set('setBackgroundTexture', widget, value)
+
+    def setBackgroundOpacity(self, widget, value):
+        self._set('setBackgroundOpacity', widget, value)
@@ -0,0 +1,61 @@
+# Compiled DRS zones per track, cached across sessions.
+#
+# A track's drs_zones.ini is parsed once into a list of (detection, start, end)
+# in ini order (the order gives the zone ids) and stored in a marshal cache
+# keyed by track and layout, with the ini's size and mtime. Later sessions on
+# the same track read the zones from the cache without touching configparser.
+#
+# Building an entry also checks the zones: every line inside [0, 1), start and
+# end reached in that order after detection (wrapping over S/F) and no two
+# zones overlapping. Problems are returned from the build only, so they are
+# reported once and not every session.
+
+from lib.config_cache import MarshalCache
+
+
+def forward(a, b):
+    # spline distance from a forward to b, wrapping over S/F
+    return (b - a) % 1.0
+
+
+def check(zones):
+    # list of problems found in the zones, empty if none
+    problems = []
+    for id, (detection, start, end) in enumerate(zones):
+        for name, value in (("detection", detection), ("start", start), ("end", end)):
+            if not 0.0 <= value < 1.0:
+                problems.append("zone %d: %s %.4f outside 0-1" % (id + 1, name, value))
+        if forward(detection, start) > forward(detection, end):
+            problems.append("zone %d: end %.4f comes before start %.4f" % (id + 1, end, start))
+    for id, (detection, start, end) in enumerate(zones):
+        for other in range(id + 1, len(zones)):
+            otherDetection, otherStart, otherEnd = zones[other]
+            if (forward(detection, otherDetection) < forward(detection, end) or
+                    forward(otherDetection, detection) < forward(otherDetection, otherEnd)):
+                problems.append("zones %d and %d overlap" % (id + 1, other + 1))
+    return problems
+
+
+def parse(path):
+    import configparser
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        raise IOError("could not read %s" % path)
+    zones = []
+    for zone in config.sections():
+        zones.append((float(config[zone]['DETECTION']), float(config[zone]['START']), float(config[zone]['END'])))
+    return zones
+
+
+class ZoneCache(MarshalCache):
+    def load(self, track, layout, path):
+        # (zones, problems, cached) for the track; problems is empty when the
+        # zones came from the cache
+        key = "%s|%s" % (track, layout)
+        entry, current = self.lookup(key, path)
+        if entry is not None:
+            return [tuple(zone) for zone in entry["zones"]], [], True
+        zones = parse(path)
+        problems = check(zones)
+        self.store(key, {"stamp": current, "zones": zones})
+        return zones, problems, False
@@ -0,0 +1,80 @@
+# DRS zones compiled into sorted line positions for bisect lookups.
+#
+# Zone ids stay the position of the zone in drs_zones.ini (that is what penalty
+# messages report), only the lookup tables are sorted. A zone covers the track
+# from its detection line to its end line, wrapping over S/F when end is before
+# detection.
+#
+# A spline step counts as a new lap when the car moved back more than NEW_LAP.
+# Over S/F only detection lines within NEAR_SF of the line are considered, as
+# in the original per zone checks.
+#
+# toDetection and toStartEnd give the spline distance to the next line ahead,
+# used to pick the update rate.
+
+from bisect import bisect_right
+
+NEW_LAP = -0.8          # spline distance below this means the car crossed S/F
+NEAR_AFTER_SF = 0.1     # detection lines below this can be crossed on a new lap
+NEAR_BEFORE_SF = 0.9    # detection lines above this can be crossed on a new lap
+
+
+def passed(line, last, cur):
+    # True if a car going from spline last to cur went over line
+    if cur - last > NEW_LAP:
+        return last < line <= cur
+    return line > last or line <= cur
+
+
+def distanceAhead(lines, spline):
+    # spline distance to the next of the sorted lines, going on over S/F
+    if not lines:
+        return 1.0
+    pos = bisect_right(lines, spline)
+    if pos < len(lines):
+        return lines[pos] - spline
+    return lines[0] + 1.0 - spline
+
+
+class ZoneIndex:
+    def __init__(self, zones):
+        self.zones = zones
+        order = sorted(range(len(zones)), key=lambda id: zones[id]["detection"])
+        self.detections = [zones[id]["detection"] for id in order]  # sorted detection lines
+        self.ids = order                                            # zone id of each sorted line
+        # detection lines that can be crossed together with S/F
+        wrap = [pos for pos, detection in enumerate(self.detections)
+                if detection < NEAR_AFTER_SF or detection > NEAR_BEFORE_SF]
+        self.wrapDetections = [self.detections[pos] for pos in wrap]
+        self.wrapIds = [self.ids[pos] for pos in wrap]
+        self.startEnds = sorted([zone["start"] for zone in zones] + [zone["end"] for zone in zones])
+
+    def __len__(self):
+        return len(self.zones)
+
+    def crossed(self, last, cur):
+        # id of the detection line crossed going from last to cur, -1 if none.
+        # Lowest id wins if more than one was crossed.
+        if cur - last > NEW_LAP:
+            lo = bisect_right(self.detections, last)
+            hi = bisect_right(self.detections, cur)
+            if lo >= hi:
+                return -1
+            return self.ids[lo] if hi - lo == 1 else min(self.ids[lo:hi])
+        # new lap, lines after last up to S/F and from S/F up to cur
+        lo = bisect_right(self.wrapDetections, last)
+        hi = bisect_right(self.wrapDetections, cur)
+        ids = self.wrapIds[lo:] + self.wrapIds[:hi]
+        return min(ids) if ids else -1
+
+    def toDetection(self, spline):
+        return distanceAhead(self.detections, spline)
+
+    def toStartEnd(self, spline):
+        return distanceAhead(self.startEnds, spline)
+
+    def inZone(self, id, spline):
+        zone = self.zones[id]
+        if zone["end"] >= zone["detection"]:
+            return zone["detection"] <= spline < zone["end"]
+        return spline >= zone["detection"] or spline < zone["end"]
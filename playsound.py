@@ -1,6 +1,100 @@
 class PlaysoundException(Exception):
     pass
 
+from collections import OrderedDict
+from os import path as osPath, stat
+from threading import Lock
+
+class SoundCache(object):
+    '''
+    Least recently used cache of loaded sounds, keyed by file path. An entry is
+    reloaded when the file's mtime changes. load(path) returns (value, size)
+    and release(value) frees whatever load opened; entries are released when
+    evicted, when reloaded and on close(). At most maxEntries entries and
+    maxBytes of size are kept (the most recent entry is always kept).
+    '''
+    def __init__(self, load, release=None, maxEntries=16, maxBytes=16 * 1024 * 1024):
+        self.load = load
+        self.release = release
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()    # path -> (mtime, size, value), oldest first
+        self.size = 0
+        self.lock = Lock()
+
+    def get(self, sound):
+        with self.lock:
+            if '://' not in sound:
+                sound = osPath.abspath(sound)
+            try:
+                mtime = stat(sound).st_mtime
+            except OSError:
+                mtime = None
+            entry = self.entries.get(sound)
+            if entry is not None:
+                if entry[0] == mtime:
+                    self.entries.move_to_end(sound)
+                    return entry[2]
+                self._drop(sound)
+            value, size = self.load(sound)
+            self.entries[sound] = (mtime, size, value)
+            self.size += size
+            while len(self.entries) > 1 and (len(self.entries) > self.maxEntries or self.size > self.maxBytes):
+                self._drop(next(iter(self.entries)))
+            return value
+
+    def _drop(self, sound):
+        mtime, size, value = self.entries.pop(sound)
+        self.size -= size
+        if self.release is not None:
+            self.release(value)
+
+    def close(self, sound=None):
+        '''
+        Releases the entry for sound, or every entry if sound is None.
+        '''
+        with self.lock:
+            if sound is None:
+                while self.entries:
+                    self._drop(next(iter(self.entries)))
+            else:
+                if '://' not in sound:
+                    sound = osPath.abspath(sound)
+                if sound in self.entries:
+                    self._drop(sound)
+
+def _fileSize(sound):
+    try:
+        return stat(sound).st_size
+    except OSError:
+        return 0
+
+def _winCommand(*command):
+    from ctypes import c_buffer, windll
+    buf = c_buffer(255)
+    command = ' '.join(command).encode()
+    errorCode = int(windll.winmm.mciSendStringA(command, buf, 254, 0))
+    if errorCode:
+        errorBuffer = c_buffer(255)
+        windll.winmm.mciGetErrorStringA(errorCode, errorBuffer, 254)
+        exceptionMessage = ('\n    Error ' + str(errorCode) + ' for command:'
+                            '\n        ' + str(command) +
+                            '\n    ' + str(errorBuffer.value))
+        raise PlaysoundException(exceptionMessage)
+    return buf.value
+
+def _openWin(sound):
+    from random import random
+    alias = 'playsound_' + str(random())
+    _winCommand('open "' + sound + '" alias', alias)
+    _winCommand('set', alias, 'time format milliseconds')
+    durationInMS = _winCommand('status', alias, 'length').decode()
+    return (alias, durationInMS), _fileSize(sound)
+
+def _closeWin(device):
+    alias, durationInMS = device
+    _winCommand('close', alias)
+
 def _playsoundWin(sound, block = False):
     '''
     Utilizes windll.winmm. Tested and known to work with MP3 and WAVE on
@@ -10,33 +104,27 @@ def _playsoundWin(sound, block = False):
     Inspired by (but not copied from) Michael Gundlach <gundlach@gmail.com>'s mp3play:
     https://github.com/michaelgundlach/mp3play
     I never would have tried using windll.winmm without seeing his code.
+    The MCI device stays open in the cache, so replaying a sound is a single
+    play command.
     '''
-    from ctypes import c_buffer, windll
-    from random import random
     from time   import sleep
 
-    def winCommand(*command):
-        buf = c_buffer(255)
-        command = ' '.join(str(command)).encode()
-        errorCode = int(windll.winmm.mciSendStringA(command, buf, 254, 0))
-        if errorCode:
-            errorBuffer = c_buffer(255)
-            windll.winmm.mciGetErrorStringA(errorCode, errorBuffer, 254)
-            exceptionMessage = ('\n    Error ' + str(errorCode) + ' for command:'
-                                '\n        ' + str(command) +
-                                '\n    ' + str(errorBuffer.value))
-            raise PlaysoundException(exceptionMessage)
-        return buf.value
-
-    alias = 'playsound_' + str(random())
-    winCommand('open "' + sound + '" alias', alias)
-    winCommand('set', alias, 'time format milliseconds')
-    durationInMS = winCommand('status', alias, 'length')
-    winCommand('play', alias, 'from 0 to', durationInMS)
+    alias, durationInMS = cache.get(sound)
+    _winCommand('play', alias, 'from 0 to', durationInMS)
 
     if block:
         sleep(float(durationInMS) / 1000.0)
 
+def _openOSX(sound):
+    from AppKit     import NSSound
+    from Foundation import NSURL
+
+    url = sound
+    if '://' not in url:
+        url = 'file://' + url
+    url   = NSURL.URLWithString_(url)
+    return NSSound.alloc().initWithContentsOfURL_byReference_(url, False), _fileSize(sound)
+
 def _playsoundOSX(sound, block = False):
     '''
     Utilizes AppKit.NSSound. Tested and known to work with MP3 and WAVE on
@@ -46,23 +134,25 @@ def _playsoundOSX(sound, block = False):
     Inspired by (but not copied from) Aaron's Stack Overflow answer here:
     http://stackoverflow.com/a/34568298/901641
     I never would have tried using AppKit.NSSound without seeing his code.
+    The loaded NSSound stays in the cache and is rewound for each play.
     '''
-    from AppKit     import NSSound
-    from Foundation import NSURL
     from time       import sleep
 
-    if '://' not in sound:
-        if not sound.startswith('/'):
-            from os import getcwd
-            sound = getcwd() + '/' + sound
-        sound = 'file://' + sound
-    url   = NSURL.URLWithString_(sound)
-    sound = NSSound.alloc().initWithContentsOfURL_byReference_(url, True)
+    sound = cache.get(sound)
+    sound.stop()
     sound.play()
 
     if block:
         sleep(sound.duration())
 
+def _openNix(sound):
+    from wave import open as waveOpen
+
+    with waveOpen(sound, 'rb') as wav:
+        channelCount, sampleWidth, framerate, frameCount, compressionType, compressionName = wav.getparams()
+        data = wav.readframes(frameCount)
+    return (channelCount, framerate, data), len(data)
+
 def _playsoundNix(sound, block = False):
     '''
     Utilizes ossaudiodev. Untested. Probably works with all version of Linux
@@ -70,21 +160,19 @@ def _playsoundNix(sound, block = False):
     Inspired by, and more or less copied from, Bill Dandreta's post on
     this mailing list (since deleted, so I link to a web archive instead):
     https://web.archive.org/web/20080218155209/http://mail.python.org/pipermail/python-list/2004-October/288905.html
+    The decoded frames stay in the cache, only the device is opened per play.
     '''
     import ossaudiodev
     from sys  import byteorder
-    from wave import open as waveOpen, AFMT_S16_LE, AFMT_S16_BE
-    
-    with waveOpen(sound, 'rb') as sound:
-        channelCount, sampleWidth, framerate, frameCount, compressionType, compressionName = sound.getparams()
-        try:
-            from ossaudiodev import AFMT_S16_NE
-        except ImportError:
-            if 'little' in byteorder.lower():
-                AFMT_S16_NE = ossaudiodev.AFMT_S16_LE
-            else:
-                AFMT_S16_NE = ossaudiodev.AFMT_S16_BE
-        data = sound.readframes(frameCount)
+
+    channelCount, framerate, data = cache.get(sound)
+    try:
+        from ossaudiodev import AFMT_S16_NE
+    except ImportError:
+        if 'little' in byteorder.lower():
+            AFMT_S16_NE = ossaudiodev.AFMT_S16_LE
+        else:
+            AFMT_S16_NE = ossaudiodev.AFMT_S16_BE
 
     speaker = ossaudiodev.open('/dev/dsp', 'w')
     speaker.setparameters(AFMT_S16_NE, channelCount, framerate)
@@ -96,9 +184,16 @@ system = system()
 
 if system == 'Windows':
     playsound = _playsoundWin
+    cache = SoundCache(_openWin, _closeWin)
 elif system == 'Darwin':
     playsound = _playsoundOSX
+    cache = SoundCache(_openOSX, lambda sound: sound.stop())
 else:
     playsound = _playsoundNix
+    cache = SoundCache(_openNix)
 
-del system
\ No newline at end of file
+def close(sound=None):
+    '''
+    Frees the cached sound (closing its device), or every cached sound.
+    '''
+    cache.close(sound)
@@ -1,32 +1,245 @@
-from threading import Thread, Event
-import winsound
+
+# Beep engine.
+#
+# The WAV file is decoded once into PCM frames. A beep of a given duration is
+# the clip repeated and cut to exactly that many frames, built once per
+# duration and kept. A cut that lands mid clip is faded out over its last
+# FADE seconds so it does not click. Beeps are queued with a start time and a repeat count and
+# played by one long lived worker thread, so a beep costs a queue push on the
+# caller's thread. Beeps that could not start within maxLatency of their
+# scheduled time are dropped instead of played late.
+#
+# Output goes through a backend with play(pcm) (blocking for the length of the
+# sound) and stop(). WinsoundBackend plays through winsound, CaptureBackend
+# plays nothing and records what was played and when, optionally into a WAV
+# file, so the timing can be checked away from Windows.
+
+from array import array
+from threading import Thread, Condition
+import heapq
+import io
+import sys
+import time
+import wave
+
+FADE = 0.005    # seconds of fade out at the end of a cut mid clip
+SAMPLE_TYPES = {1: 'B', 2: 'h', 4: 'i'}    # array type per sample width, WAV byte order
+
+
+class Pcm(object):
+    def __init__(self, frames, channels, sampleWidth, frameRate):
+        self.frames = frames
+        self.channels = channels
+        self.sampleWidth = sampleWidth
+        self.frameRate = frameRate
+        self.frameSize = channels * sampleWidth
+
+    @classmethod
+    def load(cls, filename):
+        w = wave.open(filename, 'rb')
+        try:
+            return cls(w.readframes(w.getnframes()), w.getnchannels(), w.getsampwidth(), w.getframerate())
+        finally:
+            w.close()
+
+    def __len__(self):
+        return len(self.frames) // self.frameSize
+
+    def duration(self):
+        return len(self) / float(self.frameRate)
+
+    def cut(self, duration):
+        # the clip repeated (or cut short) to exactly duration seconds
+        size = int(round(duration * self.frameRate)) * self.frameSize
+        frames = self.frames
+        if not frames:
+            return Pcm(bytes(size), self.channels, self.sampleWidth, self.frameRate)
+        cut = Pcm((frames * (size // len(frames) + 1))[:size], self.channels, self.sampleWidth, self.frameRate)
+        if size % len(frames):
+            cut.fadeOut(FADE)
+        return cut
+
+    def fadeOut(self, seconds):
+        # ramp the last seconds of the frames down to silence
+        kind = SAMPLE_TYPES.get(self.sampleWidth)
+        if kind is None:
+            return
+        samples = array(kind, self.frames)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        # 8 bit WAV is unsigned around 128
+        centre = 128 if kind == 'B' else 0
+        fadeFrames = min(len(self), int(seconds * self.frameRate))
+        first = len(self) - fadeFrames
+        for frame in range(first, len(self)):
+            gain = (len(self) - 1 - frame) / float(fadeFrames)
+            for sample in range(frame * self.channels, (frame + 1) * self.channels):
+                samples[sample] = int(centre + (samples[sample] - centre) * gain)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        self.frames = samples.tobytes()
+
+    def wav(self):
+        # the frames as a complete WAV file in memory
+        data = io.BytesIO()
+        w = wave.open(data, 'wb')
+        w.setnchannels(self.channels)
+        w.setsampwidth(self.sampleWidth)
+        w.setframerate(self.frameRate)
+        w.writeframes(self.frames)
+        w.close()
+        return data.getvalue()
+
+
+class WinsoundBackend(object):
+    def __init__(self):
+        import winsound
+        self.winsound = winsound
+        self._wavs = {}
+
+    def play(self, pcm):
+        wav = self._wavs.get(id(pcm))
+        if wav is None:
+            wav = self._wavs[id(pcm)] = pcm.wav()
+        # SND_MEMORY cannot be async, this blocks the worker for the beep
+        self.winsound.PlaySound(wav, self.winsound.SND_MEMORY)
+
+    def stop(self):
+        self.winsound.PlaySound(None, 0)
+
+
+class CaptureBackend(object):
+    # plays nothing; keeps (start time, duration) of every beep, and writes a
+    # WAV of the session (silence between beeps) to path on close if given
+    def __init__(self, path=None, realtime=True):
+        self.path = path
+        self.realtime = realtime
+        self.played = []
+        self._pcm = []
+
+    def play(self, pcm):
+        start = time.perf_counter()
+        self.played.append((start, pcm.duration()))
+        if self.path is not None:
+            self._pcm.append((start, pcm))
+        if self.realtime:
+            time.sleep(pcm.duration())
+
+    def stop(self):
+        pass
+
+    def close(self):
+        if self.path is None or not self._pcm:
+            return
+        first, pcm = self._pcm[0]
+        w = wave.open(self.path, 'wb')
+        w.setnchannels(pcm.channels)
+        w.setsampwidth(pcm.sampleWidth)
+        w.setframerate(pcm.frameRate)
+        written = 0
+        for start, pcm in self._pcm:
+            frame = int(round((start - first) * pcm.frameRate))
+            if frame > written:
+                w.writeframes(bytes((frame - written) * pcm.frameSize))
+                written = frame
+            w.writeframes(pcm.frames)
+            written += len(pcm)
+        w.close()
+        self._pcm = []
+
+
+def defaultBackend():
+    try:
+        return WinsoundBackend()
+    except ImportError:
+        return CaptureBackend()
+
 
 class SoundPlayer(object):
-    def __init__(self, filename):
-        self.filename = filename
-        self._play_event = Event()
+    def __init__(self, filename, backend=None, maxLatency=0.05):
+        self.clip = Pcm.load(filename)
+        self.backend = backend if backend is not None else defaultBackend()
+        self.maxLatency = maxLatency
+        self._beeps = {}        # duration -> Pcm
+        self._queue = []        # heap of (start, seq, pcm, repeats, gap)
+        self._seq = 0
+        self._cond = Condition()
+        self._running = True
+        self.latency = 0.0      # worst start delay of a played beep
+        self.dropped = 0
         self.thread = Thread(target=self._worker)
         self.thread.daemon = True
         self.thread.start()
-        self._audio_cache = {}
-    
-    def play(self, filename=None):
-        if filename is not None:
-            self.filename = filename
-        self._play_event.set()
-    
+
+    def beepPcm(self, duration=None):
+        if duration is None:
+            return self.clip
+        pcm = self._beeps.get(duration)
+        if pcm is None:
+            pcm = self._beeps[duration] = self.clip.cut(duration)
+        return pcm
+
+    def beep(self, duration=None, repeats=1, gap=0.0, delay=0.0):
+        # duration None plays the clip once as recorded
+        pcm = self.beepPcm(duration)
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._queue, (time.perf_counter() + delay, self._seq, pcm, repeats, gap))
+            self._cond.notify()
+
     def stop(self):
-        self._play_event.clear()
+        # drop queued beeps, one already playing runs to its end
+        with self._cond:
+            del self._queue[:]
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            del self._queue[:]
+            self._cond.notify()
+        self.backend.stop()
+        self.thread.join(1.0)
+        if hasattr(self.backend, 'close'):
+            self.backend.close()
+
+    def _next(self):
+        # wait for the next due beep, None once closed
+        with self._cond:
+            while self._running:
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                wait = self._queue[0][0] - time.perf_counter()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                start, seq, pcm, repeats, gap = heapq.heappop(self._queue)
+                if repeats > 1:
+                    heapq.heappush(self._queue, (start + pcm.duration() + gap, seq, pcm, repeats - 1, gap))
+                late = -wait
+                if late > self.maxLatency:
+                    self.dropped += 1
+                    continue
+                self.latency = max(self.latency, late)
+                return pcm
+            return None
 
     def _worker(self):
         while True:
-            self._play_event.wait()
-            winsound.PlaySound(self.filename, winsound.SND_FILENAME)
+            pcm = self._next()
+            if pcm is None:
+                return
+            self.backend.play(pcm)
 
-if __name__ == "__main__":
-    import time
-    pl = SoundPlayer("beep.wav")
-    pl.play()
-    time.sleep(1)
-    
 
+if __name__ == "__main__":
+    import sys
+    capture = CaptureBackend(sys.argv[1] if len(sys.argv) > 1 else None)
+    pl = SoundPlayer("beep.wav", capture)
+    pl.beep(0.5)
+    pl.beep(0.1, repeats=3, gap=0.1, delay=1.0)
+    time.sleep(2)
+    pl.close()
+    for start, duration in capture.played:
+        print("%.3f  %.3f s" % (start - capture.played[0][0], duration))
+    print("worst latency %.2f ms, dropped %d" % (pl.latency * 1000, pl.dropped))